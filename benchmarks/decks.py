@@ -0,0 +1,80 @@
+import random
+
+import dash_core_components as dcc
+import dash_html_components as html
+
+from xplore import Xplorable, Block
+
+
+# the shapes that synthetic blocks are drawn from, covering single cells,
+# even splits and uneven multi-row grids
+SHAPES = [
+    [[12]],
+    [[6, 6]],
+    [[4, 4, 4]],
+    [[12], [6, 6]],
+    [[8, 4], [4, 8]],
+    [[3, 3, 3, 3], [12]],
+    [[12], [4, 4, 4], [6, 6]],
+]
+
+
+def make_content(rng, num_cells):
+    """Returns a list of num_cells randomly chosen components"""
+    return [make_component(rng) for _ in range(num_cells)]
+
+
+def make_component(rng, depth=0):
+    kind = rng.choice(['text', 'list', 'nested', 'markdown', 'dropdown'])
+    if kind == 'text' or depth >= 3:
+        return html.P(' '.join(rng.choice(WORDS) for _ in range(12)))
+    if kind == 'list':
+        return html.Ul([html.Li(rng.choice(WORDS)) for _ in range(rng.randint(3, 8))])
+    if kind == 'nested':
+        return html.Div([make_component(rng, depth + 1)
+                         for _ in range(rng.randint(2, 4))])
+    if kind == 'markdown':
+        return dcc.Markdown('\n'.join(f'* {rng.choice(WORDS)}' for _ in range(5)))
+    return dcc.Dropdown(
+        options=[{'label': word, 'value': word} for word in rng.sample(WORDS, 5)],
+        value=None
+    )
+
+
+def make_block_class(rng, index):
+    """Returns a Block subclass with randomly chosen layout options"""
+    shape = rng.choice(SHAPES)
+    num_cells = sum(len(row) for row in shape)
+    attrs = {
+        'shape': shape,
+        'header': rng.random() < 0.3,
+        'title': rng.random() < 0.5,
+        'row_heights': (
+            [rng.choice([None, 20, 40, 60]) for _ in shape]
+            if rng.random() < 0.5 else None
+        ),
+        'content': make_content(rng, num_cells),
+    }
+    return type(f'SyntheticBlock{index}', (Block,), attrs)
+
+
+def make_deck(num_blocks, seed=0):
+    """
+    Returns an Xplorable subclass with num_blocks synthetic pages. The same
+    seed always gives the same deck.
+    """
+    rng = random.Random(seed)
+    pages = [make_block_class(rng, i) for i in range(num_blocks)]
+    return type(f'SyntheticDeck{num_blocks}', (Xplorable,), {
+        'title': f'Synthetic deck of {num_blocks} blocks',
+        'css_files': [],
+        'js_files': [],
+        'pages': pages,
+    })
+
+
+WORDS = [
+    'data', 'layout', 'callback', 'graph', 'slide', 'deck', 'component',
+    'row', 'column', 'figure', 'table', 'filter', 'range', 'value', 'series',
+    'axis', 'label', 'chart', 'dashboard', 'metric', 'trend', 'sample',
+]
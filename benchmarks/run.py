@@ -0,0 +1,241 @@
+"""
+Benchmarks xplore's core build and routing paths on synthetic decks.
+
+Run from the root of the repository:
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 10 100 --output results.json
+    python -m benchmarks.run --compare benchmarks/results/old.json
+
+Results are written as JSON to benchmarks/results, named by the time and
+git revision they were taken at, unless --output is given.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+import tracemalloc
+
+from xplore.components import Row
+from xplore.utils import add_content
+
+from .decks import make_deck, SHAPES
+
+
+DEFAULT_SIZES = [10, 100, 1000]
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def timed(func, repeat):
+    """Calls func repeat times, returning a summary of the times taken"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return summarise(times)
+
+
+def summarise(times):
+    return {
+        'min': min(times),
+        'median': statistics.median(times),
+        'max': max(times),
+        'repeat': len(times),
+    }
+
+
+def bench_init(deck_cls, repeat, **kwargs):
+    return timed(lambda: deck_cls(**kwargs), repeat)
+
+
+def bench_peak_memory(deck_cls, **kwargs):
+    # measured on a separate build, as tracing slows everything down
+    tracemalloc.start()
+    try:
+        deck_cls(**kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def bench_make_container(deck, repeat):
+    # the time to build the grid of every page in the deck, including
+    # adding each page's content
+    def build():
+        for page in deck.page_list:
+            page._make_container()
+    return timed(build, repeat)
+
+
+def bench_row(repeat, loops=1000):
+    results = {}
+    for shape in SHAPES:
+        for row_shape in shape:
+            key = '-'.join(map(str, row_shape))
+            if key in results:
+                continue
+            stats = timed(lambda: [Row(shape=row_shape) for _ in range(loops)],
+                          repeat)
+            results[key] = per_loop(stats, loops)
+    return results
+
+
+def bench_add_content(deck, repeat):
+    # add_content is destructive, so each repeat adds content into freshly
+    # built, empty containers. only the add_content calls are timed
+    pages = [page for page in deck.page_list if hasattr(page, 'content')]
+    times = []
+    for _ in range(repeat):
+        containers = [_make_empty_container(page) for page in pages]
+        start = time.perf_counter()
+        for page, container in zip(pages, containers):
+            add_content(container, page.content)
+        times.append(time.perf_counter() - start)
+    return summarise(times)
+
+
+def _make_empty_container(page):
+    content = type(page).__dict__.get('content')
+    try:
+        # hide the class's content so that _make_container doesn't add it
+        del type(page).content
+        return page._make_container()
+    finally:
+        type(page).content = content
+
+
+def bench_router(deck, requests):
+    client = deck.app.server.test_client()
+    routes = sorted(deck.routes)
+    start = time.perf_counter()
+    total_bytes = 0
+    for i in range(requests):
+        response = client.post('/_dash-update-component', json={
+            'output': {'id': 'page', 'property': 'children'},
+            'inputs': [{
+                'id': 'url',
+                'property': 'pathname',
+                'value': routes[i % len(routes)]
+            }],
+        })
+        total_bytes += len(response.data)
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': requests,
+        'seconds': elapsed,
+        'requests_per_second': requests / elapsed,
+        'mean_response_bytes': total_bytes / requests,
+    }
+
+
+def per_loop(stats, loops):
+    return {key: (value / loops if key != 'repeat' else value)
+            for key, value in stats.items()}
+
+
+def run(sizes, repeat, router_requests, lazy=False):
+    results = {}
+    for size in sizes:
+        deck_cls = make_deck(size)
+        # large decks take long enough that a single build is representative
+        size_repeat = repeat if size < 1000 else 1
+        print(f'{size} blocks...', file=sys.stderr)
+
+        deck = deck_cls(lazy=lazy)
+        results[str(size)] = {
+            'init': bench_init(deck_cls, size_repeat, lazy=lazy),
+            'peak_memory_bytes': bench_peak_memory(deck_cls, lazy=lazy),
+            'make_container': bench_make_container(deck, size_repeat),
+            'add_content': bench_add_content(deck, size_repeat),
+            'router': bench_router(deck, router_requests),
+        }
+
+    results['row'] = bench_row(repeat)
+    return results
+
+
+def get_environment():
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {
+        'revision': revision,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+
+
+def compare(old, new, path=()):
+    """Yields (path, old, new, ratio) for each timing in both results"""
+    for key, new_value in new.items():
+        if key not in old:
+            continue
+        if isinstance(new_value, dict):
+            yield from compare(old[key], new_value, path + (key,))
+        elif key in ('median', 'peak_memory_bytes', 'requests_per_second'):
+            old_value = old[key]
+            ratio = new_value / old_value if old_value else float('nan')
+            yield '.'.join(path + (key,)), old_value, new_value, ratio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="The numbers of blocks in the synthetic decks")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="The number of times to repeat each timing")
+    parser.add_argument('--router-requests', type=int, default=500,
+                        help="The number of router requests to time")
+    parser.add_argument('--lazy', action='store_true',
+                        help="Build the decks with lazy=True")
+    parser.add_argument('--output', help="The file to write the results to")
+    parser.add_argument('--compare', help="A previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    report = {
+        'environment': get_environment(),
+        'options': {
+            'sizes': args.sizes,
+            'repeat': args.repeat,
+            'router_requests': args.router_requests,
+            'lazy': args.lazy,
+        },
+        'results': run(args.sizes, args.repeat, args.router_requests, args.lazy),
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_PATH, exist_ok=True)
+        name = '{}-{}.json'.format(
+            time.strftime('%Y%m%d-%H%M%S'),
+            report['environment']['revision'] or 'unknown'
+        )
+        output = os.path.join(RESULTS_PATH, name)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {output}', file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        for path, old_value, new_value, ratio in compare(old['results'],
+                                                          report['results']):
+            print(f'{path:60} {old_value:>14.6g} {new_value:>14.6g} {ratio:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,9 @@ setup(
     ],
     packages=find_packages(),
     package_data={'xplore': ['static']},
+    entry_points={
+        'console_scripts': ['xplore=xplore.cli:main'],
+    },
     classifiers=[
     # How mature is this project? Common values are
     #   3 - Alpha
@@ -136,6 +136,10 @@ class DashExample(Block):
     ]
     row_classes = ['center-y', '']
 
+    shared_data = True
+    cache_data = True
+    data_sources = ['data/indicators.csv.gz']
+
     def get_data(self):
         self.data = {}
         csv_path = os.path.join(self.project_path, 'data', 'indicators.csv.gz')
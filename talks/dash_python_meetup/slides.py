@@ -9,7 +9,7 @@ import dash_core_components as dcc
 import plotly.graph_objs as go
 from dash.dependencies import Input, Output, State
 
-from xplore import Block
+from xplore import Block, IndexedFrame
 from xplore.layouts import *
 from xplore.components import Col, Row, Image, FontA, Box, BackgroundImage
 
@@ -171,10 +171,18 @@ class DashExample(Block):
     ]
     row_heights = [10, None]
     
+    shared_data = True
+    cache_data = True
+    data_sources = ['data/indicators.csv.gz']
+    cache_callbacks = True
+
     def get_data(self):
         self.data = {}
         csv_path = os.path.join(self.project_path, 'data', 'indicators.csv.gz')
-        self.data['df'] = pd.read_csv(os.path.join(csv_path))
+        self.data['df'] = IndexedFrame(
+            pd.read_csv(os.path.join(csv_path)),
+            keys=['Year', 'Indicator Name']
+        )
 
     @property
     def content(self):
@@ -239,13 +247,14 @@ class DashExample(Block):
                          xaxis_type, yaxis_type,
                          year_value):
             df = self.data['df']
-            dff = df[df['Year'] == year_value]
+            dffx = df.select({'Year': year_value, 'Indicator Name': xaxis_column_name})
+            dffy = df.select({'Year': year_value, 'Indicator Name': yaxis_column_name})
 
             return {
                 'data': [go.Scatter(
-                    x=dff[dff['Indicator Name'] == xaxis_column_name]['Value'],
-                    y=dff[dff['Indicator Name'] == yaxis_column_name]['Value'],
-                    text=dff[dff['Indicator Name'] == yaxis_column_name]['Country Name'],
+                    x=dffx['Value'],
+                    y=dffy['Value'],
+                    text=dffy['Country Name'],
                     mode='markers',
                     marker={
                         'size': 15,
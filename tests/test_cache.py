@@ -0,0 +1,98 @@
+import json
+
+import dash_core_components as dcc
+import dash_html_components as html
+from dash.dependencies import Input, Output
+from flask import Response
+
+from xplore import Xplorable, Block
+from xplore.cache import CallbackCache
+
+
+def test_entries_are_evicted_by_bytes():
+    cache = CallbackCache(max_bytes=105)
+    for name in 'abcd':
+        cache.set(('deck', name), b'x' * 30)
+
+    # each entry is 35 bytes with its key, so only three fit
+    assert cache.get(('deck', 'a')) is None
+    assert cache.stats()['bytes'] == 105
+    assert cache.stats()['evictions'] == 1
+
+    # reading an entry makes it the most recently used
+    cache.get(('deck', 'b'))
+    cache.set(('deck', 'e'), b'x' * 30)
+    assert cache.get(('deck', 'b')) is not None
+    assert cache.get(('deck', 'c')) is None
+
+
+def test_entries_bigger_than_the_cache_are_not_stored():
+    cache = CallbackCache(max_bytes=100)
+    cache.set(('deck', 'a'), b'x' * 30)
+    cache.set(('deck', 'b'), b'x' * 200)
+
+    assert cache.get(('deck', 'b')) is None
+    assert cache.get(('deck', 'a')) is not None
+
+
+def test_responses_are_keyed_by_version():
+    cache = CallbackCache(max_bytes=1000)
+    calls = []
+    version = [0]
+
+    def callback(value):
+        calls.append(value)
+        return Response(json.dumps([value, version[0]]),
+                        mimetype='application/json')
+
+    cached = cache.memoize(callback, 'out.children', 'deck',
+                           version=lambda: version[0])
+    assert cached(1).get_data() == cached(1).get_data() == b'[1, 0]'
+    version[0] = 1
+    assert cached(1).get_data() == b'[1, 1]'
+    assert calls == [1, 1]
+
+
+calls = []
+
+
+class Echo(Block):
+    cache_callbacks = True
+    content = [html.Div([dcc.Input(id='word', value='a'), html.Div(id='echo')])]
+
+    def get_data(self):
+        self.suffix = '!'
+
+    def callbacks(self, app):
+        @app.callback(Output('echo', 'children'), [Input('word', 'value')])
+        def echo(word):
+            calls.append(word)
+            return word + self.suffix
+
+
+class Deck(Xplorable):
+    title = 'Echo'
+    css_files = []
+    js_files = []
+    pages = [Echo]
+
+
+def test_swapped_data_isnt_served_from_the_cache():
+    deck = Deck()
+    block = deck.page_list[0]
+    client = deck.app.server.test_client()
+    calls.clear()
+
+    def echo(word):
+        response = client.post('/_dash-update-component', json={
+            'output': {'id': 'echo', 'property': 'children'},
+            'inputs': [{'id': 'word', 'property': 'value', 'value': word}],
+        })
+        return json.loads(response.data)['response']['props']['children']
+
+    assert echo('hi') == echo('hi') == 'hi!'
+    assert calls == ['hi']
+
+    block._swap_data({'suffix': '?'})
+    assert echo('hi') == 'hi?'
+    assert calls == ['hi', 'hi']
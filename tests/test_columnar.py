@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from xplore.columnar import write_frame, read_frame
+from xplore.dataset import IndexedFrame
+
+
+def indicators():
+    return pd.DataFrame({
+        'Country Name': ['Australia', 'Australia', 'Fiji', 'Fiji', None],
+        'Indicator Name': ['GDP growth (annual %)', 'Life expectancy',
+                           'GDP growth (annual %)', 'Life expectancy',
+                           'Life expectancy'],
+        'Year': [2007, 2007, 2007, 2007, 2008],
+        'Value': [3.8, 81.3, np.nan, 67.9, 70.1],
+        'Region': pd.Categorical(['Oceania'] * 5),
+        'Code': pd.Series(['AUS', 'AUS', 'FJI', 'FJI', 1], dtype=object),
+    })
+
+
+def test_indicators_round_trip_with_their_dtypes(tmp_path):
+    frame = indicators()
+    write_frame(IndexedFrame(frame, keys=['Year', 'Indicator Name']),
+                str(tmp_path / 'frame'))
+
+    df = read_frame(str(tmp_path / 'frame'))
+
+    assert df.keys == ['Year', 'Indicator Name']
+    # copied, as the columns are memory-mapped
+    pd.testing.assert_frame_equal(df.frame.copy(), frame)
+    assert list(df.frame.dtypes) == list(frame.dtypes)
+    assert list(df['Indicator Name'].unique()) == list(
+        frame['Indicator Name'].unique())
+    assert len(df.select({'Year': 2007, 'Indicator Name': 'Life expectancy'})) == 2
+
+
+def test_unsupported_values_name_their_column(tmp_path):
+    frame = pd.DataFrame({'Year': [2007], 'Notes': [{'source': 'WB'}]})
+
+    with pytest.raises(TypeError, match="'Notes'"):
+        write_frame(frame, str(tmp_path / 'frame'))
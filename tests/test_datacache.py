@@ -0,0 +1,56 @@
+import os
+from multiprocessing import Pool
+
+import pandas as pd
+import pytest
+
+from xplore.datacache import DataCache
+
+
+def load():
+    return pd.DataFrame({'a': [1, 2, 3]})
+
+
+def get_from_cache(args):
+    cache_path, source, calls_path = args
+
+    def loader():
+        with open(calls_path, 'a') as f:
+            f.write('called\n')
+        return load()
+
+    return len(DataCache(cache_path).get('key', [source], loader))
+
+
+def test_clearing_everything_leaves_other_files(tmp_path):
+    source = tmp_path / 'data.csv'
+    source.write_text('a\n1\n')
+    other = tmp_path / 'notes.txt'
+    other.write_text('keep me')
+    cache = DataCache(str(tmp_path))
+    cache.get('key', [str(source)], load)
+
+    cache.clear()
+
+    assert cache.entries() == []
+    assert other.read_text() == 'keep me'
+    assert source.exists()
+
+
+def test_clearing_a_missing_key_raises(tmp_path):
+    cache = DataCache(str(tmp_path))
+    for key in ('missing', '..', '/etc'):
+        with pytest.raises(KeyError):
+            cache.clear(key)
+
+
+def test_processes_starting_together_load_once(tmp_path):
+    source = tmp_path / 'data.csv'
+    source.write_text('a\n1\n')
+    calls_path = tmp_path / 'calls'
+    args = (str(tmp_path / 'cache'), str(source), str(calls_path))
+
+    with Pool(4) as pool:
+        assert pool.map(get_from_cache, [args] * 8) == [3] * 8
+
+    assert calls_path.read_text() == 'called\n'
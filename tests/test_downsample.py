@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from xplore.downsample import lttb, min_max, parse_relayout, DownsampledSeries
+from xplore.exceptions import ValidationException
+
+
+rng = np.random.default_rng(0)
+X = np.arange(10000, dtype=float)
+Y = np.cumsum(rng.normal(size=len(X)))
+
+
+@pytest.mark.parametrize('downsample', [
+    lambda n: lttb(X, Y, n),
+    lambda n: min_max(Y, n),
+])
+def test_endpoints_are_kept_within_the_width(downsample):
+    for n in (4, 100, 999):
+        indices = downsample(n)
+        assert indices[0] == 0 and indices[-1] == len(X) - 1
+        assert len(indices) <= n + 2
+        assert (np.diff(indices) > 0).all()
+
+
+@pytest.mark.parametrize('downsample', [
+    lambda x, y, n: lttb(x, y, n),
+    lambda x, y, n: min_max(y, n),
+])
+def test_short_series_are_kept_whole(downsample):
+    x = np.arange(10.0)
+    for n in (10, 50):
+        np.testing.assert_array_equal(downsample(x, np.sin(x), n), np.arange(10))
+
+
+def test_min_max_keeps_the_extremes_of_each_bucket():
+    n = 100
+    indices = set(min_max(Y, n))
+
+    edges = np.linspace(0, len(Y), n // 2 + 1).astype(int)
+    for start, end in zip(edges[:-1], edges[1:]):
+        assert start + np.argmin(Y[start:end]) in indices
+        assert start + np.argmax(Y[start:end]) in indices
+
+
+def test_lttb_keeps_a_spike():
+    y = np.zeros(10000)
+    y[5000] = 100
+    assert 5000 in lttb(X, y, 100)
+
+
+def test_gaps_are_kept():
+    y = Y.copy()
+    y[5000:5020] = np.nan
+    for indices in (lttb(X, y, 100), min_max(y, 100)):
+        assert np.isnan(y[indices]).any()
+        assert indices[0] == 0 and indices[-1] == len(y) - 1
+
+
+def test_parse_relayout():
+    assert parse_relayout(None) is False
+    assert parse_relayout({'autosize': True}) is False
+    assert parse_relayout({'xaxis.autorange': True, 'yaxis.autorange': True}) is None
+    assert parse_relayout({'xaxis.range[0]': 1, 'xaxis.range[1]': 5}) == (1, 5)
+    assert parse_relayout({'xaxis.range': [2, 3]}) == (2, 3)
+    assert parse_relayout({'xaxis.range[0]': 1, 'xaxis.range[1]': 5}, 'yaxis') is False
+    assert parse_relayout({'yaxis.range[0]': -1, 'yaxis.range[1]': 1}, 'yaxis') == (-1, 1)
+
+
+def test_zoomed_ranges_are_downsampled_within_the_range():
+    x = pd.date_range('2020-01-01', periods=len(Y), freq='min')
+    series = DownsampledSeries(x, {'a': Y}, width=50)
+
+    zoomed_x, zoomed_y = series.downsample(('2020-01-02', '2020-01-03'))['a']
+
+    assert len(zoomed_x) <= 50
+    # one point either side of the range, so lines run to the edges
+    assert zoomed_x[0] < pd.Timestamp('2020-01-02') <= zoomed_x[1]
+    assert zoomed_x[-2] <= pd.Timestamp('2020-01-03') < zoomed_x[-1]
+
+
+def test_unsorted_x_is_rejected():
+    with pytest.raises(ValidationException):
+        DownsampledSeries([3, 1, 2], [1, 2, 3])
@@ -0,0 +1,52 @@
+import base64
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+from xplore.encoding import ARRAY_KEY, encode_figure
+
+
+def unpack(value):
+    packed = value[ARRAY_KEY]
+    return np.frombuffer(base64.b64decode(packed['data']),
+                         dtype=np.dtype(packed['dtype']).newbyteorder('<'))
+
+
+def test_dict_figure_with_plotly_traces_is_packed():
+    x = np.arange(100)
+    y = pd.Series(np.linspace(0, 1, 100))
+    figure = {
+        'data': [go.Scatter(x=x, y=y, mode='markers')],
+        'layout': go.Layout(title='Prices'),
+    }
+
+    encoded = encode_figure(figure, 'binary')
+
+    trace = encoded['data'][0]
+    assert isinstance(trace, dict)
+    assert trace['mode'] == 'markers'
+    assert ARRAY_KEY in trace['x'] and ARRAY_KEY in trace['y']
+    assert trace['x'][ARRAY_KEY]['dtype'] == 'int32'
+    np.testing.assert_array_equal(unpack(trace['x']), x)
+    np.testing.assert_array_equal(unpack(trace['y']), y.to_numpy())
+    assert isinstance(encoded['layout'], dict)
+
+
+def test_float32_downcasts_floats():
+    figure = go.Figure(data=[go.Scatter(y=np.linspace(0, 1, 100))])
+
+    trace = encode_figure(figure, 'float32')['data'][0]
+
+    assert trace['y'][ARRAY_KEY]['dtype'] == 'float32'
+    np.testing.assert_allclose(unpack(trace['y']), np.linspace(0, 1, 100),
+                               rtol=1e-6)
+
+
+def test_short_and_non_numeric_arrays_are_left_alone():
+    figure = {'data': [{'x': [1, 2, 3], 'text': ['a'] * 100}]}
+
+    trace = encode_figure(figure, 'binary')['data'][0]
+
+    assert trace['x'] == [1, 2, 3]
+    assert trace['text'] == ['a'] * 100
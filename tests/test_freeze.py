@@ -0,0 +1,70 @@
+import json
+import os
+
+import dash_core_components as dcc
+import dash_html_components as html
+from dash.dependencies import Input, Output
+from dash.exceptions import PreventUpdate
+
+from xplore import Xplorable, Block, ParametricBlock
+from xplore.freeze import freeze, route_file_name, FROZEN_PATH
+
+
+class Picker(Block):
+    content = [html.Div([
+        dcc.Dropdown(id='fruit', value='apple', options=[
+            {'label': fruit, 'value': fruit}
+            for fruit in ('apple', 'pear', 'plum')
+        ]),
+        html.Div(id='picked'),
+    ])]
+
+    def callbacks(self, app):
+        @app.callback(Output('picked', 'children'), [Input('fruit', 'value')])
+        def pick(fruit):
+            if fruit == 'pear':
+                raise PreventUpdate
+            if fruit == 'plum':
+                raise ValueError('out of season')
+            return fruit
+
+
+class Country(ParametricBlock):
+    url_pattern = '/country/<name>'
+
+    def get_params(self):
+        return ['AU', "Côte d'Ivoire"]
+
+    @property
+    def content(self):
+        return html.H1(self.params['name'])
+
+
+class Deck(Xplorable):
+    title = 'Frozen'
+    css_files = []
+    js_files = []
+    pages = [Picker, Country]
+
+
+def test_callbacks_that_raise_are_left_out(tmp_path):
+    report = freeze(Deck(), str(tmp_path))
+
+    assert report['frozen'] == ['picked.children']
+    [(callback_id, reason)] = report['errors']
+    assert callback_id == 'picked.children'
+    assert 'ValueError: out of season' in reason
+
+    path = tmp_path / FROZEN_PATH / 'callbacks' / 'picked.children.json'
+    outputs = json.loads(path.read_text())['outputs']
+    assert list(outputs) == ['["apple"]']
+
+
+def test_routes_are_written_to_flat_file_names(tmp_path):
+    freeze(Deck(), str(tmp_path))
+
+    routes = os.listdir(tmp_path / FROZEN_PATH / 'routes')
+    assert 'country~2FAU.json' in routes
+    assert 'country~2FC~25C3~25B4te~2520d~2527Ivoire.json' in routes
+    assert route_file_name('/') == '_index'
+    assert all('%' not in name and '/' not in name for name in routes)
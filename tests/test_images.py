@@ -0,0 +1,34 @@
+from PIL import Image as PILImage
+
+from xplore import images
+from xplore.components import Image
+from xplore.images import ImageVariants
+
+
+def test_narrow_originals_are_only_opened_once(tmp_path, monkeypatch):
+    static = tmp_path / 'static'
+    static.mkdir()
+    PILImage.new('RGB', (100, 50)).save(static / 'small.png')
+    variants = ImageVariants(str(static), str(tmp_path / 'variants'))
+
+    opened = []
+    open_image = images.PILImage.open
+    monkeypatch.setattr(images.PILImage, 'open',
+                        lambda path: opened.append(path) or open_image(path))
+
+    assert variants.get_variant('small.png', 480) is None
+    assert variants.get_variant('small.png', 480) is None
+    assert len(opened) == 1
+
+
+def test_images_keep_their_src_by_default():
+    image = Image('charts.jpg').to_plotly_json()['props']
+    assert image['src'] == '/static/img/charts.jpg'
+    assert '480w' in image['srcSet']
+    assert (image['loading'], image['decoding']) == ('lazy', 'async')
+
+
+def test_images_on_screen_can_load_eagerly():
+    image = Image('charts.jpg', loading=None).to_plotly_json()['props']
+    assert 'loading' not in image
+    assert image['decoding'] == 'async'
@@ -0,0 +1,51 @@
+import os
+import importlib
+from types import SimpleNamespace
+
+import dash_html_components as html
+
+from xplore import block
+from xplore.skeleton import clear_skeletons
+from xplore.utils import LayoutIndex, add_content, replace_element, encode_json
+
+
+TALK_PATH = os.path.join(os.path.dirname(__file__), '..', 'talks',
+                         'dash_python_meetup')
+
+
+def encode_talk():
+    deck = importlib.import_module('main').DashTalk()
+    return {route: deck._get_encoded_route(route) for route in deck.routes}
+
+
+def test_talk_layouts_are_the_same_without_index_skeletons_or_copies(monkeypatch):
+    monkeypatch.syspath_prepend(TALK_PATH)
+    monkeypatch.chdir(TALK_PATH)
+    clear_skeletons()
+    encoded = encode_talk()
+
+    # layouts built the way Dash does: searching the tree for each element,
+    # changing it in place and building every grid from scratch
+    monkeypatch.setattr(LayoutIndex, 'get', lambda self, id_name: None)
+    monkeypatch.setattr(LayoutIndex, 'replace', lambda self, id_name, value: False)
+    monkeypatch.setattr(LayoutIndex, 'copy_on_write', lambda self, path: path[-1])
+    monkeypatch.setattr(block, 'get_skeleton',
+                        lambda key, build: SimpleNamespace(instantiate=build))
+
+    assert encode_talk() == encoded
+    clear_skeletons()
+
+
+def test_changes_within_content_leave_it_unchanged():
+    content = html.Div([html.P(id='greeting', children='Hello')])
+    before = encode_json(content)
+    first = html.Div([html.Div(id='content-1')])
+    second = html.Div([html.Div(id='content-1')])
+
+    add_content(first, content)
+    add_content(second, content)
+    replace_element(first, 'greeting', html.P('Goodbye'))
+
+    assert encode_json(content) == before
+    assert b'Goodbye' in encode_json(first)
+    assert encode_json(second) == encode_json(html.Div([content]))
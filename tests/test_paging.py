@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from xplore.exceptions import ValidationException
+from xplore.paging import PagedFrame
+
+
+def countries():
+    return pd.DataFrame({
+        'country': ['Australia', 'Fiji', 'New Zealand', 'Papua New Guinea',
+                    'Samoa', 'Tonga', 'Vanuatu'],
+        'gdp': [2.1, np.nan, 3.0, 1.2, 0.5, np.nan, 3.0],
+    }, index=list('abcdefg'))
+
+
+def test_filter_ignores_case_and_matches_any_column():
+    paged = PagedFrame(countries(), page_size=10)
+
+    rows, row_count, page = paged.get_page(1, ' NEW ')
+    assert list(rows['country']) == ['New Zealand', 'Papua New Guinea']
+    assert (row_count, page) == (2, 1)
+
+    rows, _, _ = paged.get_page(1, '3.0')
+    assert list(rows['country']) == ['New Zealand', 'Vanuatu']
+
+
+def test_sort_is_stable_with_missing_values_last():
+    paged = PagedFrame(countries(), page_size=10)
+
+    rows, _, _ = paged.get_page(1, sort_by='gdp')
+    assert list(rows.index) == ['e', 'd', 'a', 'c', 'g', 'b', 'f']
+
+    rows, _, _ = paged.get_page(1, sort_by='gdp', ascending=False)
+    assert list(rows.index) == ['c', 'g', 'a', 'd', 'e', 'b', 'f']
+
+    rows, _, _ = paged.get_page(1, sort_by='population')
+    assert list(rows.index) == list('abcdefg')
+
+
+def test_pages_are_clamped():
+    paged = PagedFrame(countries(), page_size=3)
+
+    assert paged.get_page(2)[0].index.tolist() == ['d', 'e', 'f']
+    rows, row_count, page = paged.get_page(99)
+    assert (rows.index.tolist(), row_count, page) == (['g'], 7, 3)
+    assert paged.get_page(0)[2] == 1
+    assert paged.get_page(None)[2] == 1
+    assert paged.get_page('two')[2] == 1
+
+
+def test_empty_results_have_one_empty_page():
+    paged = PagedFrame(countries(), page_size=3)
+
+    rows, row_count, page = paged.get_page(5, 'atlantis')
+    assert rows.empty
+    assert (row_count, page) == (0, 1)
+
+
+def test_queries_are_reused_up_to_the_limit():
+    paged = PagedFrame(countries())
+    paged.max_queries = 2
+
+    first = paged.positions('a')
+    assert paged.positions('A ') is first
+    paged.positions('e')
+    paged.positions('i')
+    assert paged.positions('a') is not first
+
+
+def test_unknown_columns_are_rejected():
+    with pytest.raises(ValidationException):
+        PagedFrame(countries(), columns=['country', 'population'])
@@ -0,0 +1,97 @@
+import pytest
+import dash_html_components as html
+
+from xplore import Xplorable, Block, ParametricBlock
+from xplore.exceptions import ValidationException
+from xplore.metrics import UNKNOWN_ROUTE
+
+
+built = []
+
+
+class Intro(Block):
+    content = html.H1('Intro')
+
+
+class Country(ParametricBlock):
+    url_pattern = '/country/<code>'
+    max_members = 3
+
+    def get_params(self):
+        return ['AU', 'NZ', 'PG']
+
+    def get_data(self):
+        built.append(self.params['code'])
+
+    @property
+    def content(self):
+        return html.H1(self.params['code'])
+
+
+class Outro(Block):
+    content = html.H1('Outro')
+
+
+class Deck(Xplorable):
+    title = 'Countries'
+    css_files = []
+    js_files = []
+    pages = [Intro, Country, Outro]
+
+
+def test_alternating_members_are_not_rebuilt():
+    deck = Deck()
+    built.clear()
+
+    for _ in range(3):
+        for code in ('PG', 'NZ'):
+            deck._serve_page(f'/country/{code}')
+
+    assert built == ['PG', 'NZ']
+
+
+def test_links_to_neighbours_dont_build_members():
+    deck = Deck()
+    built.clear()
+
+    member = deck._get_page('/country/NZ')
+
+    assert member.prev_page.href == '/country/AU'
+    assert member.next_page.href == '/country/PG'
+    assert deck._get_page('/country/PG').next_page.href == '/outro'
+    assert deck.page_list[0].next_page.href == '/country/AU'
+    assert built == ['NZ', 'PG']
+    # AU was built at startup for the family's short route, /2
+    assert list(deck.families[0]._members) == [('AU',), ('NZ',), ('PG',)]
+
+
+def test_get_params_must_be_defined():
+    class Region(ParametricBlock):
+        url_pattern = '/region/<name>'
+
+    with pytest.raises(ValidationException):
+        Region(None, 1, '.')
+
+
+def test_route_labels_dont_build_members():
+    deck = Deck(metrics=True)
+    built.clear()
+
+    assert deck._get_route_label('/country/NZ') == '/country/<code>'
+    assert deck._get_route_label('/country/XX') == UNKNOWN_ROUTE
+    assert deck._get_route_label('/intro') == '/intro'
+    assert built == []
+
+
+def test_members_have_distinct_block_keys():
+    class Pair(ParametricBlock):
+        url_pattern = '/pair/<first>/<second>'
+
+        def get_params(self):
+            return [{'first': first, 'second': second} for first, second in
+                    [('a', 'b-c'), ('a-b', 'c'), ('a b', 'c'), ('a,b', 'c')]]
+
+    family = Pair(None, 1, '.')
+    keys = {family._get_member_at(i)._block_key for i in range(4)}
+    assert len(keys) == 4
+    assert all('/' not in key for key in keys)
@@ -0,0 +1,123 @@
+import json
+
+import numpy as np
+import pandas as pd
+import dash_html_components as html
+
+from xplore import Xplorable, Block
+from xplore.components import PagedTable, DownsampledGraph
+from xplore.refresh import DataRefresher
+
+
+source = {'countries': ['Australia', 'Fiji'], 'fail': False}
+
+
+class Countries(Block):
+    refresh_interval = 60
+    shape = [[12], [12]]
+
+    def get_data(self):
+        if source['fail']:
+            raise OSError('source unavailable')
+        self.data = pd.DataFrame({'country': source['countries']})
+        self.y = np.arange(len(source['countries']) * 1000.0)
+
+    @property
+    def content(self):
+        return [PagedTable('countries', self.data),
+                DownsampledGraph('growth', np.arange(len(self.y)), self.y)]
+
+    def callbacks(self, app):
+        self.add_paging(app, 'countries')
+        self.add_downsampling(app, 'growth')
+
+
+class Deck(Xplorable):
+    title = 'Refresh'
+    css_files = []
+    js_files = []
+    pages = [Countries]
+
+
+def call(client, output, inputs):
+    response = client.post('/_dash-update-component', json={
+        'output': {'id': output[0], 'property': output[1]},
+        'inputs': [{'id': id_name, 'property': prop, 'value': value}
+                   for id_name, prop, value in inputs],
+    })
+    return json.loads(response.data)['response']['props']
+
+
+def get_countries(client):
+    children = call(client, ('countries-rows', 'children'), [
+        ('countries-filter', 'value', ''),
+        ('countries-sort', 'value', None),
+        ('countries-order', 'value', 'asc'),
+        ('countries-page', 'value', 1),
+    ])['children']
+    body = children[0]['props']['children'][1]['props']['children']
+    return [row['props']['children'][0]['props']['children'] for row in body]
+
+
+def get_last_x(client):
+    figure = call(client, ('growth', 'figure'), [
+        ('growth', 'relayoutData', {'xaxis.autorange': True}),
+    ])['figure']
+    return figure['data'][0]['x'][-1]
+
+
+def test_refreshed_data_reaches_paged_tables_and_downsampled_graphs():
+    source.update(countries=['Australia', 'Fiji'], fail=False)
+    deck = Deck()
+    block = deck.page_list[0]
+    client = deck.app.server.test_client()
+    assert get_countries(client) == ['Australia', 'Fiji']
+    assert get_last_x(client) == 1999
+
+    source['countries'] = ['Nauru', 'Samoa', 'Tonga']
+    assert deck.data_refresher.refresh(block)
+
+    assert block._data_version == 1
+    assert get_countries(client) == ['Nauru', 'Samoa', 'Tonga']
+    assert get_last_x(client) == 2999
+
+
+def test_failed_refresh_keeps_the_current_data():
+    source.update(countries=['Australia', 'Fiji'], fail=False)
+    deck = Deck()
+    block = deck.page_list[0]
+    data = block.data
+
+    source['fail'] = True
+    assert not deck.data_refresher.refresh(block)
+
+    assert block.data is data
+    assert block._data_version == 0
+    source['fail'] = False
+
+
+class Notes(Block):
+    refresh_on_change = True
+    data_sources = []
+
+    def get_data(self):
+        with open(self._get_data_sources()[0]) as f:
+            self.notes = f.read()
+
+    @property
+    def content(self):
+        return html.P(self.notes)
+
+
+def test_changed_sources_are_due(tmp_path, monkeypatch):
+    path = tmp_path / 'notes.txt'
+    path.write_text('first')
+    monkeypatch.setattr(Notes, 'data_sources', [str(path)])
+    block = Notes(None, 1, str(tmp_path))
+    refresher = DataRefresher([block], poll_interval=1)
+
+    assert not refresher._is_due(block, 0)
+    path.write_text('second version')
+    assert refresher._is_due(block, 0)
+    assert refresher.refresh(block)
+    assert block.notes == 'second version'
@@ -0,0 +1,125 @@
+import json
+
+import dash_html_components as html
+import dash_core_components as dcc
+from dash.dependencies import Input, Output
+
+from xplore import Xplorable, Block, config
+from xplore.components import Image
+from xplore.utils import deck_url_prefix
+
+
+class Table(Block):
+    data_sources = []
+
+    def get_data(self):
+        with open(self._get_data_sources()[0]) as f:
+            self.rows = f.read().splitlines()
+
+    @property
+    def content(self):
+        return html.Ul([html.Li(row) for row in self.rows])
+
+
+class Deck(Xplorable):
+    title = 'Versions'
+    css_files = []
+    js_files = []
+    pages = [Table]
+
+
+def test_changing_a_data_source_changes_the_lazy_layout_version(tmp_path, monkeypatch):
+    data_path = tmp_path / 'data.csv'
+    monkeypatch.setattr(Table, 'data_sources', [str(data_path)])
+
+    data_path.write_text('a\nb\n')
+    version = Deck(lazy=True).layout_version
+    assert Deck(lazy=True).layout_version == version
+
+    data_path.write_text('a\nb\nc\n')
+    assert Deck(lazy=True).layout_version != version
+
+
+class Gallery(Block):
+    content = [html.Div([
+        Image(src='a.png', lazy=False),
+        html.P('Files live in "/static/"'),
+        dcc.Input(id='name', value='b.png'),
+        html.Div(id='chosen'),
+    ])]
+
+    def callbacks(self, app):
+        @app.callback(Output('chosen', 'children'), [Input('name', 'value')])
+        def choose(name):
+            return Image(src=name, lazy=False)
+
+
+class GalleryDeck(Xplorable):
+    title = 'Gallery'
+    css_files = []
+    js_files = []
+    pages = [Gallery]
+
+
+def test_prefix_is_added_to_urls_in_layouts_and_callback_output():
+    deck = GalleryDeck(url_prefix='/photos')
+
+    layout = deck._get_encoded_route('/gallery').decode('utf-8')
+    assert '"/photos/static/img/a.png"' in layout
+    assert 'Files live in \\"/static/\\"' in layout
+
+    client = deck.app.server.test_client()
+    response = client.post('/_dash-update-component', json={
+        'output': {'id': 'chosen', 'property': 'children'},
+        'inputs': [{'id': 'name', 'property': 'value', 'value': 'b.png'}],
+    })
+    image = json.loads(response.data)['response']['props']['children']
+    assert image['props']['src'] == '/photos/static/img/b.png'
+
+
+class Intro(Block):
+    content = html.Div([html.H1('Intro'), Image(src='a.png', lazy=False)])
+
+
+class Outro(Block):
+    content = html.H1('Outro')
+
+
+class RouterDeck(Xplorable):
+    title = 'Router'
+    css_files = []
+    js_files = []
+    pages = [Intro, Outro]
+
+
+def test_router_responses_match_dash():
+    deck = RouterDeck(url_prefix='/talk')
+
+    with deck.app.server.test_request_context():
+        for pathname in ('/talk', '/talk/intro', '/talk/2', '/talk/outro'):
+            served = deck._serve_page(pathname).get_data()
+            with deck_url_prefix('/talk'):
+                expected = deck._display_page(pathname).get_data()
+            assert json.loads(served) == json.loads(expected)
+    # the encoded response is shared by every route to the page
+    assert deck._get_encoded_route('/') is deck._get_encoded_route('/intro')
+
+
+def test_unknown_routes_fall_back_to_dash():
+    deck = RouterDeck()
+    client = deck.app.server.test_client()
+
+    response = client.post('/_dash-update-component', json={
+        'output': {'id': config.PAGE_ELEMENT_ID, 'property': 'children'},
+        'inputs': [{'id': 'url', 'property': 'pathname', 'value': '/missing'}],
+    })
+
+    page = json.loads(response.data)['response']['props']['children']
+    assert page['props']['children'] == "No page '/missing'"
+    assert '/missing' not in deck.encoded_routes
+
+
+def test_index_page_layout_is_the_first_pages_layout():
+    deck = RouterDeck(lazy=True)
+    assert deck.index_page is deck.page_list[0]
+    assert deck.index_page_layout is deck.page_list[0].layout
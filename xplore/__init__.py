@@ -1,4 +1,8 @@
+# set before importing the modules that use it
+__version__ = '0.0.1'
+
 from .xplorable import Xplorable
 from .block import Block
-
-__version__ = '0.0.1'
+from .parametric import ParametricBlock
+from .host import XploreHost
+from .dataset import IndexedFrame
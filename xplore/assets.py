@@ -0,0 +1,187 @@
+import os
+import re
+import base64
+import hashlib
+import posixpath
+from functools import lru_cache
+from urllib.parse import quote
+
+from . import config
+
+
+# images referenced from CSS that are small enough to be inlined
+INLINE_TYPES = {
+    '.svg': 'image/svg+xml',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+}
+
+CSS_URL_RE = re.compile(r'''url\(\s*(['"]?)(.*?)\1\s*\)''')
+CSS_CHARSET_RE = re.compile(r'@charset\s+[^;]+;')
+SOURCE_MAP_RE = re.compile(r'^\s*(//|/\*)[#@] sourceMappingURL=.*$', re.MULTILINE)
+
+# strings are kept as they are, comments are dropped unless marked as
+# important with /*!, and whitespace is collapsed, or removed entirely
+# around characters where it is never significant
+CSS_TOKEN_RE = re.compile(r'''
+    ("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')   # strings
+    |(/\*!.*?\*/)                           # important comments
+    |(/\*.*?\*/)                            # comments
+    |\s*([{};,>])\s*                        # punctuation
+    |(\s+)                                  # whitespace
+''', re.DOTALL | re.VERBOSE)
+
+
+class Bundle:
+    """A concatenated asset, named after a hash of its contents"""
+
+    def __init__(self, kind, body):
+        self.kind = kind
+        self.body = body
+        self.hash = hashlib.sha256(body).hexdigest()[:16]
+        self.name = f'xplore.{self.hash}.{kind}'
+        self.mimetype = 'text/css' if kind == 'css' else 'application/javascript'
+
+
+class Asset:
+    """A CSS or JS file, along with the URL it would be served from"""
+
+    def __init__(self, path, url, file_path=None):
+        self.path = path
+        self.url = url
+        self.file_path = file_path
+
+    @property
+    def is_local(self):
+        return self.file_path is not None and os.path.isfile(self.file_path)
+
+
+def build_bundles(assets, kind):
+    """
+    Groups a list of Assets into bundles, returning a list of the Bundles
+    and of the URLs of assets that can't be bundled, such as external URLs,
+    in their original order. Runs of local files are concatenated into a
+    single bundle, with duplicate files included only once. CSS is minified
+    by process_css, but JS is included as it is, apart from source map
+    comments.
+    """
+    items = []
+    run = []
+    seen = set()
+
+    def end_run():
+        if run:
+            items.append(Bundle(kind, b'\n'.join(run)))
+            run.clear()
+
+    for asset in assets:
+        if not asset.is_local:
+            end_run()
+            items.append(asset.url)
+            continue
+
+        with open(asset.file_path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+
+        if kind == 'css':
+            text = process_css(content.decode('utf-8'), asset)
+        else:
+            # a trailing semicolon stops files running into each other
+            text = SOURCE_MAP_RE.sub('', content.decode('utf-8')) + '\n;'
+        run.append(text.encode('utf-8'))
+
+    end_run()
+    return items
+
+
+def process_css(css, asset):
+    """
+    Prepares a CSS file for inclusion in a bundle by rewriting its relative
+    URLs to be relative to the server root, inlining small images and
+    minifying it.
+    """
+    base_url = posixpath.dirname(asset.url)
+    base_path = os.path.dirname(asset.file_path)
+
+    def rewrite(match):
+        target = match.group(2)
+        if not _is_relative(target):
+            return match.group(0)
+
+        path, suffix = _split_suffix(target)
+        file_path = os.path.normpath(os.path.join(base_path, path))
+        if not suffix:
+            data_uri = inline_file(file_path)
+            if data_uri is not None:
+                return f'url("{data_uri}")'
+
+        url = posixpath.normpath(posixpath.join(base_url, path)) + suffix
+        return f'url("{url}")'
+
+    css = CSS_CHARSET_RE.sub('', css)
+    css = SOURCE_MAP_RE.sub('', css)
+    css = CSS_URL_RE.sub(rewrite, css)
+    return minify_css(css)
+
+
+def minify_css(css):
+    def replace(match):
+        string, important, comment, punctuation, whitespace = match.groups()
+        if string is not None:
+            return string
+        if important is not None:
+            return important
+        if comment is not None:
+            return ''
+        if punctuation is not None:
+            return punctuation
+        return ' '
+
+    css = CSS_TOKEN_RE.sub(replace, css)
+    return css.replace(';}', '}').strip()
+
+
+@lru_cache(maxsize=None)
+def inline_file(file_path):
+    """
+    Returns a data URI for the image at file_path, or None if it isn't an
+    image or is larger than config.INLINE_ASSET_MAX_BYTES.
+    """
+    mimetype = INLINE_TYPES.get(os.path.splitext(file_path)[1].lower())
+    if mimetype is None or not os.path.isfile(file_path):
+        return None
+    if os.path.getsize(file_path) > config.INLINE_ASSET_MAX_BYTES:
+        return None
+
+    with open(file_path, 'rb') as f:
+        content = f.read()
+    if mimetype == 'image/svg+xml':
+        # SVG is smaller percent-encoded than base64 encoded
+        svg = ' '.join(content.decode('utf-8').split())
+        return 'data:image/svg+xml,' + quote(svg, safe=" =:/'")
+    return f'data:{mimetype};base64,' + base64.b64encode(content).decode('ascii')
+
+
+def xplore_static_path(path):
+    """Returns the path to a file within xplore's static folder"""
+    base_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(base_path, config.STATIC_PATH, path)
+
+
+def _is_relative(url):
+    return not (url == '' or url.startswith(('/', '#', 'data:')) or
+                re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*:', url))
+
+
+def _split_suffix(url):
+    # splits off any query string or fragment
+    match = re.search(r'[?#]', url)
+    if match is None:
+        return url, ''
+    return url[:match.start()], url[match.start():]
@@ -1,19 +1,30 @@
+import os
+import inspect
 from itertools import chain
+from functools import wraps
+from contextlib import nullcontext
+from threading import RLock
 
 import dash_core_components as dcc
 import dash_html_components as html
+from dash.dependencies import Input, Output
+from dash.exceptions import PreventUpdate
 
-from .utils import slugify, camel_case_to_title, add_content
+from .utils import (slugify, camel_case_to_title, add_content, LayoutIndex,
+                    get_layout_index, set_layout_index, find_element,
+                    replace_element, deck_url_prefix)
 from .exceptions import ValidationException
-from .components import Row, Col, left_right_nav
-
-# note: current gotcha with Block class is that layout trees in content
-# attribute will be shared across all instances of the class becuase
-# content is a class attribute 
-# workaround1 -- define content as @property method
-# workaround2 -- create deep copy of the content layout on creation of
-#                each instance.
-# both seem suboptimal
+from .components import Row, Col, left_right_nav, table_page
+from .skeleton import get_skeleton
+from .downsample import parse_relayout
+from .encoding import check_figure_encoding, encode_figure
+
+# note: layout trees in the content attribute are shared across all
+# instances of the class because content is a class attribute. rather than
+# deep copying the content for each instance, add_content marks it as shared
+# in the layout's index, and replacing an element inside it (eg through
+# replace_element) copies only the path down to that element. changing a
+# shared component's props directly will still affect every instance.
 
 # another issue:
 # currently Block class can't really be instantiated manually, only in the context
@@ -21,6 +32,68 @@ from .components import Row, Col, left_right_nav
 # -- reassess
 
 
+class BlockApp:
+    """
+    Proxy for the Dash app that is handed to a Block's callbacks method.
+
+    Callbacks registered through it are wrapped so that the Block is
+    materialised (ie its data loaded and layout built) before the callback
+    runs. Figures returned by the callbacks of Blocks with a figure_encoding
+    have their numeric arrays packed (see encoding.py). All other attribute
+    access is passed through to the Dash app.
+    """
+
+    def __init__(self, block, app):
+        self._block = block
+        self._app = app
+
+    def __getattr__(self, name):
+        return getattr(self._app, name)
+
+    def callback(self, output, inputs=[], state=[], events=[]):
+        register = self._app.callback(output, inputs, state, events)
+
+        def wrap_func(func):
+            @wraps(func)
+            def materialised_func(*args, **kwargs):
+                self._block.materialise()
+                output_value = func(*args, **kwargs)
+                encoding = self._block.figure_encoding
+                if encoding is not None and output.component_property == 'figure':
+                    output_value = encode_figure(output_value, encoding)
+                return output_value
+
+            callback = register(materialised_func)
+
+            block = self._block
+            callback_id = '{}.{}'.format(
+                output.component_id, output.component_property)
+            if block.cache_callbacks and block.callback_cache is not None:
+                callback = block.callback_cache.memoize(
+                    callback,
+                    callback_id,
+                    block._block_key,
+                    ttl=block.callback_cache_ttl,
+                    version=lambda: block._data_version
+                )
+            if block.url_prefix:
+                # Dash encodes the output within the callback, so components
+                # holding the deck's URLs are encoded with the prefix
+                callback = _with_url_prefix(callback, block.url_prefix)
+            self._app.callback_map[callback_id]['callback'] = callback
+            return callback
+
+        return wrap_func
+
+
+def _with_url_prefix(callback, url_prefix):
+    @wraps(callback)
+    def prefixed_callback(*args):
+        with deck_url_prefix(url_prefix):
+            return callback(*args)
+    return prefixed_callback
+
+
 class Block:
 
     css_files = []
@@ -33,51 +106,217 @@ class Block:
     row_vcenter = True
     row_classes = None
     row_heights = None
+    shared_data = False
+    cache_data = False
+    data_sources = None
+    cache_callbacks = False
+    callback_cache_ttl = None
+    refresh_interval = None
+    refresh_on_change = False
+    figure_encoding = None
     
-    def __init__(self, app, index, project_path, name=None, url=None):
-        self.app = app
+    def __init__(self, app, index, project_path, name=None, url=None,
+                 lazy=False, data_store=None, data_cache=None,
+                 callback_cache=None, profile=None, defer_callbacks=False,
+                 url_prefix=''):
         self.index = index
+        self.url_prefix = url_prefix
+        self.profile = profile
+        self.data_store = data_store
+        self.data_cache = data_cache
+        self.callback_cache = callback_cache
+        self.app = BlockApp(self, app) if app is not None else None
         
         # TODO -- this is an ugly hack
         self.project_path = project_path
         
+        if self.refresh_on_change and not self.data_sources:
+            msg = "'refresh_on_change' param requires 'data_sources'"
+            raise ValidationException(msg)
+        check_figure_encoding(self.figure_encoding)
+
         if name is not None:
             self._name = name
 
         if url is not None:
             self._url = url
 
-        if hasattr(self, 'get_data'):
+        self.is_materialised = False
+        self.encoded_layout = None
+        self._data_loaded = False
+        self._data_version = 0
+        self._finalised = False
+        self._materialise_lock = RLock()
+        # elements that helpers such as add_downsampling serve, by ID
+        self._served_elements = {}
+
+        if not lazy:
+            self.materialise()
+
+        # callbacks are always registered up front, as Dash needs to know
+        # about all of them when the page is first served. In lazy mode
+        # this means that the callbacks method must not touch anything
+        # created by get_data. Xplorables building their pages concurrently
+        # defer the callbacks until every page is built, then register them
+        # in page order.
+        if not defer_callbacks:
+            with self._timed('_init_callbacks'):
+                self._init_callbacks()
+
+    # families of blocks, such as ParametricBlocks, stand in for several
+    # pages, the first and last of which are linked to their neighbours
+    is_family = False
+
+    @property
+    def first_page(self):
+        return self
+
+    @property
+    def last_page(self):
+        return self
+
+    def materialise(self):
+        # load the data and build the layout. this happens on creation of the
+        # block, or for lazily created blocks, on first use.
+        if self.is_materialised:
+            return
+
+        with self._materialise_lock:
+            if self.is_materialised:
+                return
+
+            # the data may already have been loaded by another process
+            if hasattr(self, 'get_data') and not self._data_loaded:
+                with self._timed('get_data'):
+                    self._load_data()
+
+            try:
+                with self._timed('_get_layout'):
+                    self.layout = self._get_layout()
+                with self._timed('_add_classes'):
+                    self._add_classes()
+                with self._timed('_add_styles'):
+                    self._add_styles()
+            except ValidationException as e:
+                # An error was encountered while constructing the supplied
+                # layout. Construct a basic layout containing information on
+                # the error
+
+                # TODO this error layout needs to be the global layout
+                # attached to the Story. otherwise for multi page layouts it
+                # will just be embedded somewhere in the middle of the
+                # document.
+                self.layout = html.P(str(e))
+
+            if self._finalised:
+                self._add_layout_hooks()
+
+            if self.profile is not None:
+                self.profile.set_node_count(self, self.layout)
+
+            self.is_materialised = True
+
+    def _timed(self, phase):
+        # times a phase of building the block when profiling
+        if self.profile is None:
+            return nullcontext()
+        return self.profile.phase(phase, page=self)
+
+    def _load_data(self):
+        # blocks with cache_data set have the data attribute created by
+        # get_data cached on disk, invalidated when the files listed in
+        # data_sources or the block's code change.
+        #
+        # blocks with shared_data set have the data loaded once into the
+        # data store, which all processes then share a read-only view of.
+        #
+        # note that in both cases get_data is not called when the data is
+        # found already loaded, so only the data attribute is restored.
+        key = self._block_key
+        cached = self._uses_data_cache
+        shared = self._uses_data_store
+
+        if not (cached or shared):
             self.get_data()
+            return
+
+        def load():
+            if cached:
+                return self.data_cache.get(
+                    key,
+                    self._get_data_sources(),
+                    self._get_data,
+                    code=self._get_source_code()
+                )
+            return self._get_data()
+
+        self.data = self.data_store.get(key, load) if shared else load()
+
+    @property
+    def _uses_data_cache(self):
+        return self.cache_data and self.data_cache is not None
+
+    @property
+    def _uses_data_store(self):
+        return self.shared_data and self.data_store is not None
 
+    def _get_data(self):
+        self.get_data()
+        return self.data
+
+    def _get_data_sources(self):
+        sources = self.data_sources if self.data_sources is not None else []
+        return [os.path.join(self.project_path, path) for path in sources]
+
+    @property
+    def refreshes(self):
+        # whether the block's data is reloaded while the app is running
+        return hasattr(self, 'get_data') and (
+            self.refresh_interval is not None or self.refresh_on_change)
+
+    def _reload_data(self):
+        # refreshed data is always loaded from scratch. the data cache and
+        # store only ever hold the data loaded at startup
+        self.get_data()
+        if self._served_elements:
+            # elements served by helpers such as add_paging hold their own
+            # copy of the data, so they're rebuilt from the reloaded data
+            layout = self._make_layout()
+            self._served_elements = {
+                id_name: find_element(layout, id_name)
+                for id_name in self._served_elements
+            }
+
+    def _swap_data(self, changes):
+        # replaces the attributes set by get_data with their reloaded values.
+        # cached callback responses computed from the old data are dropped
+        self.__dict__.update(changes)
+        self._data_version += 1
+        if self.callback_cache is not None:
+            self.callback_cache.clear(self._block_key)
+
+    def _get_source_code(self):
         try:
-            self.layout = self._get_layout()
-            self._add_classes()
-            self._add_styles()
-        except ValidationException as e:
-            # An error was encountered while constructing the supplied layout.
-            # Construct a basic layout containing information on the error
-            
-            # TODO this error layout needs to be the global layout attached to
-            # the Story. otherwise for multi page layouts it will just be
-            # embedded somewhere in the middle of the document.
-            self.layout = html.P(str(e))   
-            
-        self._init_callbacks()
+            return inspect.getsource(type(self))
+        except (OSError, TypeError):
+            return ''
 
     def finalise(self):
         # do things that have to happen after creation of all other blocks
         # in the story
-        self._add_layout_hooks()
+        self._finalised = True
+        if self.is_materialised:
+            with self._timed('finalise'):
+                self._add_layout_hooks()
 
     def _add_layout_hooks(self):
-        if 'next-page' in self.layout:
-            link = dcc.Link(self.layout['next-page'], href=self.next_page.url)
-            self.layout['next-page'] = link
-
-        if 'prev-page' in self.layout:
-            link = dcc.Link(self.layout['prev-page'], href=self.prev_page.url)
-            self.layout['prev-page'] = link
+        index = get_layout_index(self.layout)
+        for id_name, page in (('next-page', self.next_page),
+                              ('prev-page', self.prev_page)):
+            element = find_element(self.layout, id_name, index)
+            if element is not None:
+                link = dcc.Link(element, href=page.href)
+                replace_element(self.layout, id_name, link, index)
             
     def _get_layout(self):
         # use of get_layout method or shape and content attrs will override a
@@ -91,8 +330,11 @@ class Block:
         return layout
 
     def _make_layout(self):
-        container = self._make_container()
-        layout = [left_right_nav(id='nav-links')]
+        with self._timed('_make_container'):
+            container = self._make_container()
+        nav = get_skeleton('nav', lambda: left_right_nav(id='nav-links'))
+        nav = nav.instantiate()
+        layout = [nav]
 
         if self.header:
             layout.append(html.H1(
@@ -103,9 +345,37 @@ class Block:
             container.style = {'height':'90vh'}
 
         layout.append(container)
-        return html.Div(layout)
+        layout = html.Div(layout)
+
+        # carry the indices of the nav and container up to the whole layout
+        index = LayoutIndex()
+        index.update(get_layout_index(nav))
+        index.update(get_layout_index(container))
+        set_layout_index(layout, index)
+        return layout
     
     def _make_container(self):
+        # blocks with the same grid options share a skeleton of the grid,
+        # from which each block gets a cheap copy
+        skeleton = get_skeleton(self._skeleton_key, self._make_grid)
+        container = skeleton.instantiate()
+
+        if self.title:
+            # the div holding the rows may be shared, so replace it
+            title_row = Row(html.H1(id='title', children=self.name))
+            container.children = html.Div([title_row] + container.children.children)
+
+        if hasattr(self, 'content'):
+            if isinstance(self.content, list):
+                num_elements = len(list(chain.from_iterable(self.shape)))
+                if num_elements != len(self.content):
+                    msg = "'shape' param must have same number elements as 'content' param" 
+                    raise ValidationException(msg)
+            add_content(container, self.content)
+
+        return container
+    
+    def _make_grid(self):
         if self.row_classes is not None and len(self.row_classes) != len(self.shape):
             msg = "'row_classes' param must be the same length as 'shape' param" 
             raise ValidationException(msg)
@@ -115,9 +385,7 @@ class Block:
             raise ValidationException(msg)
 
         row_list = []
-
-        if self.title:
-            row_list.append(Row(html.H1(id='title', children=self.name)))
+        index = LayoutIndex()
 
         start_id = 1
         for i, row_shape in enumerate(self.shape):        
@@ -135,7 +403,7 @@ class Block:
             else:
                 style = {}
 
-            row_list.append(Row(
+            row = Row(
                 shape=row_shape,
                 start_id=start_id,
                 col_classes=col_classes,
@@ -143,7 +411,9 @@ class Block:
                 className=' '.join(row_classes),
                 style=style,
                 
-            ))
+            )
+            row_list.append(row)
+            index.update(get_layout_index(row))
             start_id += len(row_shape)
 
         container_classes = ['container-fluid']
@@ -159,17 +429,21 @@ class Block:
             className=' '.join(container_classes),
             children=html.Div(row_list)
         )
+        set_layout_index(container, index)
+        return container
 
-        if hasattr(self, 'content'):
-            if isinstance(self.content, list):
-                num_elements = len(list(chain.from_iterable(self.shape)))
-                if num_elements != len(self.content):
-                    msg = "'shape' param must have same number elements as 'content' param" 
-                    raise ValidationException(msg)
-            add_content(container, self.content)
+    @property
+    def _skeleton_key(self):
+        # the options that determine the structure of the grid
+        return (
+            _freeze(self.shape),
+            self.hcenter,
+            self.vcenter,
+            self.row_vcenter,
+            _freeze(self.row_classes),
+            _freeze(self.row_heights),
+        )
 
-        return container
-    
     def _add_classes(self):
         if hasattr(self, 'classes'):
             new_classes = self.classes
@@ -188,6 +462,73 @@ class Block:
         if self.app is not None and hasattr(self, 'callbacks'):
             self.callbacks(self.app)
 
+    def add_downsampling(self, app, graph_id):
+        """
+        Registers a callback that re-downsamples the DownsampledGraph with
+        the ID to the visible x range whenever it's zoomed or panned, and
+        back to the full range when it's reset. Call it from the callbacks
+        method, passing on the app.
+        """
+        self._served_elements.setdefault(graph_id, None)
+
+        @app.callback(Output(graph_id, 'figure'),
+                      [Input(graph_id, 'relayoutData')])
+        def downsample(relayout_data):
+            x_range = parse_relayout(relayout_data)
+            if x_range is False:
+                raise PreventUpdate
+
+            graph = self._get_served_element(graph_id)
+            series = getattr(graph, '_downsampled_series', None)
+            if series is None:
+                msg = f"'{graph_id}' is not a DownsampledGraph in '{self.name}'"
+                raise ValidationException(msg)
+
+            layout = dict(graph.figure['layout'])
+            if x_range is not None:
+                # the new figure replaces the zoomed one, so the zoom is kept
+                # by fixing the ranges that the relayout set
+                for axis in ('xaxis', 'yaxis'):
+                    axis_range = parse_relayout(relayout_data, axis)
+                    if axis_range:
+                        layout[axis] = dict(layout.get(axis, {}),
+                                            range=list(axis_range),
+                                            autorange=False)
+            return {'data': series.traces(x_range), 'layout': layout}
+
+    def add_paging(self, app, table_id):
+        """
+        Registers a callback that filters, sorts and pages the PagedTable
+        with the ID on the server whenever its controls change. Call it from
+        the callbacks method, passing on the app.
+        """
+        self._served_elements.setdefault(table_id, None)
+
+        @app.callback(Output(f'{table_id}-rows', 'children'),
+                      [Input(f'{table_id}-filter', 'value'),
+                       Input(f'{table_id}-sort', 'value'),
+                       Input(f'{table_id}-order', 'value'),
+                       Input(f'{table_id}-page', 'value')])
+        def page(filter_text, sort_by, order, page):
+            table = self._get_served_element(table_id)
+            paged = getattr(table, '_paged_frame', None)
+            if paged is None:
+                msg = f"'{table_id}' is not a PagedTable in '{self.name}'"
+                raise ValidationException(msg)
+
+            rows, row_count, page = paged.get_page(
+                page, filter_text, sort_by, ascending=order != 'desc')
+            return table_page(paged, rows, row_count, page)
+
+    def _get_served_element(self, id_name):
+        # the IDs of elements within content aren't in the layout's index,
+        # so each is searched for once rather than on every callback
+        element = self._served_elements.get(id_name)
+        if element is None:
+            element = find_element(self.layout, id_name)
+            self._served_elements[id_name] = element
+        return element
+
     @property
     def all_css_files(self):
         if hasattr(super(), 'css_class'):
@@ -202,6 +543,11 @@ class Block:
         else:
             return self.__class__.js_files
         
+    @property
+    def _block_key(self):
+        # identifies the block class across processes
+        return f'{type(self).__module__}.{type(self).__qualname__}'
+
     @property
     def url(self):
         if not hasattr(self, '_url'):
@@ -212,8 +558,21 @@ class Block:
     def url(self, url):
         self._url = url
         
+    @property
+    def href(self):
+        # the URL of the block as seen by the browser, which includes the
+        # prefix of an Xplorable mounted below the server root
+        return f'{self.url_prefix}{self.url}'
+
     @property
     def name(self):
         if not hasattr(self, '_name'):
             self._name = camel_case_to_title(self.__class__.__name__)
         return self._name
+
+
+def _freeze(value):
+    # a hashable version of a list option
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
@@ -0,0 +1,108 @@
+import json
+import time
+from functools import wraps
+from threading import Lock
+from collections import OrderedDict
+
+from flask import Response
+
+
+class CallbackCache:
+    """
+    A least recently used cache of encoded callback responses, bounded by the
+    total number of bytes held rather than by the number of entries.
+
+    Callbacks are memoized on the values of their inputs and state, so that
+    returning to a previously seen combination of inputs is served from
+    memory without running the callback or encoding its output.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def memoize(self, callback, callback_id, namespace, ttl=None, version=None):
+        """
+        Wraps a Dash callback, as returned by app.callback, so that its
+        responses are cached. Entries are grouped under namespace, and expire
+        after ttl seconds if ttl is not None. If given, version is called
+        for a value that's part of each entry's key, so that responses
+        computed before the version changed are never served after it.
+        """
+        @wraps(callback)
+        def cached_callback(*args):
+            args_key = json.dumps(args, sort_keys=True, default=str)
+            key = (namespace, f'{callback_id}:{args_key}')
+            if version is not None:
+                key = (namespace, f'{key[1]}:{version()}')
+            body = self.get(key)
+            if body is not None:
+                return Response(body, mimetype='application/json')
+
+            response = callback(*args)
+            if response.status_code == 200:
+                self.set(key, response.get_data(), ttl)
+            return response
+
+        return cached_callback
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def set(self, key, body, ttl=None):
+        entry_size = _get_size(key, body)
+        if entry_size > self.max_bytes:
+            return
+
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, expires)
+            self.size += entry_size
+
+            while self.size > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def clear(self, namespace=None):
+        """Removes all entries, or just those under namespace"""
+        with self._lock:
+            keys = [key for key in self._entries
+                    if namespace is None or key[0] == namespace]
+            for key in keys:
+                self._remove(key)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def _remove(self, key):
+        body, _ = self._entries.pop(key)
+        self.size -= _get_size(key, body)
+
+
+def _get_size(key, body):
+    return len(key[0]) + len(key[1]) + len(body)
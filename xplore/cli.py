@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+import argparse
+import importlib
+
+from . import config
+from .freeze import freeze, MAX_COMBINATIONS
+from .datacache import DataCache
+from .parallel import CONCURRENCY_MODES
+
+
+def load_xplorable(spec, **kwargs):
+    """
+    Loads an Xplorable from a 'module:name' spec, where name refers to either
+    an Xplorable instance or an Xplorable subclass, which is instantiated
+    with kwargs.
+    """
+    module_name, _, attr = spec.partition(':')
+    if not attr:
+        raise SystemExit(f"'{spec}' must be of the form 'module:name'")
+
+    # decks are typically run from their own directory
+    sys.path.insert(0, os.getcwd())
+    module = importlib.import_module(module_name)
+    xplorable = getattr(module, attr)
+
+    if isinstance(xplorable, type):
+        xplorable = xplorable(**kwargs)
+    elif kwargs:
+        raise SystemExit(f"'{spec}' must be an Xplorable subclass")
+    return xplorable
+
+
+def freeze_command(args):
+    xplorable = load_xplorable(args.xplorable)
+    report = freeze(xplorable, args.output, args.max_combinations,
+                    precompress=args.precompress)
+
+    print(f"Froze {len(xplorable.all_routes)} routes to {args.output}")
+    for callback_id in report['frozen']:
+        print(f"Precomputed callback: {callback_id}")
+    for callback_id in report['skipped']:
+        print(f"Skipped callback (inputs not finite or too many): {callback_id}")
+    for callback_id, reason in report['errors']:
+        print(f"Warning: callback raised errors: {callback_id} ({reason})")
+    for asset_path in report['missing_assets']:
+        print(f"Warning: missing asset: {asset_path}")
+
+
+def profile_command(args):
+    xplorable = load_xplorable(args.xplorable, profile=True,
+                               concurrency=args.concurrency)
+    profile = xplorable.startup_profile
+    if args.json:
+        print(profile.to_json(indent=2))
+    else:
+        print(profile.table())
+
+
+def images_command(args):
+    xplorable = load_xplorable(args.xplorable)
+    count = 0
+    for src in xplorable.images.generate():
+        print(f"Generated variants of {src}")
+        count += 1
+    print(f"Generated variants of {count} images in {xplorable.images.cache_path}")
+
+
+def cache_list_command(args):
+    entries = DataCache(args.path).entries()
+    if not entries:
+        print(f"No cached data in {args.path}")
+        return
+
+    for entry in entries:
+        created = time.strftime('%Y-%m-%d %H:%M:%S',
+                                time.localtime(entry['created']))
+        status = 'stale' if entry['stale'] else 'valid'
+        size = entry['size'] / (1024*1024)
+        print(f"{entry['key']}  {size:.1f} MB  {created}  {status}")
+        for source in entry['sources']:
+            print(f"    {source}")
+
+
+def cache_clear_command(args):
+    try:
+        DataCache(args.path).clear(args.key)
+    except KeyError:
+        raise SystemExit(f"No cached data for '{args.key}' in {args.path}")
+    print(f"Cleared {args.key if args.key else 'all cached data'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='xplore')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    freeze_parser = subparsers.add_parser(
+        'freeze',
+        help="Export an Xplorable as a static site"
+    )
+    freeze_parser.add_argument(
+        'xplorable',
+        help="The Xplorable to freeze, as 'module:name'"
+    )
+    freeze_parser.add_argument('output', help="The output directory")
+    freeze_parser.add_argument(
+        '--max-combinations',
+        type=int,
+        default=MAX_COMBINATIONS,
+        help="Callbacks with more input combinations than this are skipped"
+    )
+    freeze_parser.add_argument(
+        '--precompress',
+        action='store_true',
+        help="Also write gzip and brotli compressed copies of each file"
+    )
+    freeze_parser.set_defaults(func=freeze_command)
+
+    profile_parser = subparsers.add_parser(
+        'profile',
+        help="Report how long each page of an Xplorable takes to build"
+    )
+    profile_parser.add_argument(
+        'xplorable',
+        help="The Xplorable subclass to profile, as 'module:name'"
+    )
+    profile_parser.add_argument(
+        '--concurrency',
+        choices=CONCURRENCY_MODES,
+        help="Build the pages concurrently, using threads or processes"
+    )
+    profile_parser.add_argument(
+        '--json',
+        action='store_true',
+        help="Output the report as JSON"
+    )
+    profile_parser.set_defaults(func=profile_command)
+
+    images_parser = subparsers.add_parser(
+        'images',
+        help="Generate the resized variants of an Xplorable's images"
+    )
+    images_parser.add_argument(
+        'xplorable',
+        help="The Xplorable whose images to resize, as 'module:name'"
+    )
+    images_parser.set_defaults(func=images_command)
+
+    cache_parser = subparsers.add_parser(
+        'cache',
+        help="Inspect and clear the cache of Block data"
+    )
+    cache_parser.add_argument(
+        '--path',
+        default=config.DATA_CACHE_PATH,
+        help="The cache directory (default: %(default)s)"
+    )
+    cache_subparsers = cache_parser.add_subparsers(dest='cache_command')
+    cache_subparsers.required = True
+
+    list_parser = cache_subparsers.add_parser('list', help="List cached data")
+    list_parser.set_defaults(func=cache_list_command)
+
+    clear_parser = cache_subparsers.add_parser('clear', help="Clear cached data")
+    clear_parser.add_argument(
+        'key',
+        nargs='?',
+        help="The Block to clear, eg 'slides.DashExample'. Clears all if omitted"
+    )
+    clear_parser.set_defaults(func=cache_clear_command)
+
+    args = parser.parse_args(argv)
+    args.func(args)
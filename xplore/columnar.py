@@ -0,0 +1,202 @@
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .dataset import IndexedFrame
+
+
+# Frames are stored as a directory containing one .npy file per column along
+# with a meta.json file describing the columns. Numeric, boolean and datetime
+# columns are stored as raw arrays, which means they can be memory-mapped
+# rather than read into memory. All other columns are stored as categorical
+# codes plus their categories, which are never pickled, so that reading a
+# frame can't run code, and are converted back to their original dtype on
+# reading. The keys of IndexedFrames are recorded so that their indices can
+# be rebuilt on reading.
+
+META_FILE = 'meta.json'
+
+# frames written in another version of the format aren't read
+FORMAT_VERSION = 3
+
+
+def write_frame(frame, path):
+    """
+    Writes a DataFrame or IndexedFrame, or a dict of them, to path. The frame
+    is first written to a temporary directory which is then renamed into
+    place, so that readers never see a partially written frame.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+
+    try:
+        if not isinstance(frame, dict):
+            _write_single_frame(frame, tmp_path)
+        else:
+            for i, sub_frame in enumerate(frame.values()):
+                _write_single_frame(sub_frame, os.path.join(tmp_path, str(i)))
+            with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+                json.dump({'format': FORMAT_VERSION, 'frames': list(frame)}, f)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def read_frame(path, mmap_mode='r'):
+    """
+    Reads a frame written by write_frame. With the default mmap_mode, column
+    arrays are read-only views onto the memory-mapped files, which are shared
+    between all processes that read the same frame.
+    """
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get('format') != FORMAT_VERSION:
+        raise ValueError(f"'{path}' was written by another version of xplore")
+
+    if 'frames' in meta:
+        return {
+            name: read_frame(os.path.join(path, str(i)), mmap_mode)
+            for i, name in enumerate(meta['frames'])
+        }
+
+    columns = {
+        i: _read_column(path, column, mmap_mode)
+        for i, column in enumerate(meta['columns'])
+    }
+
+    if meta['index'] is None:
+        index = pd.RangeIndex(meta['length'])
+    else:
+        index = pd.Index(_read_column(path, meta['index'], mmap_mode),
+                         name=meta['index']['name'])
+
+    # copy=False keeps the memory-mapped arrays as the frame's blocks.
+    # note that older versions of pandas may still copy when consolidating
+    frame = pd.DataFrame(columns, index=index, copy=False)
+    frame.columns = [column['name'] for column in meta['columns']]
+
+    if meta.get('index_keys') is not None:
+        return IndexedFrame(frame, meta['index_keys'])
+    return frame
+
+
+def is_frame(path):
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            return json.load(f).get('format') == FORMAT_VERSION
+    except (OSError, ValueError):
+        return False
+
+
+def _write_single_frame(frame, path):
+    os.makedirs(path, exist_ok=True)
+
+    index_keys = None
+    if isinstance(frame, IndexedFrame):
+        index_keys = frame.keys
+        frame = frame.frame
+
+    meta = {
+        'format': FORMAT_VERSION,
+        'index_keys': index_keys,
+        'length': len(frame),
+        'columns': [
+            _write_column(frame.iloc[:, i], frame.columns[i], path, str(i))
+            for i in range(frame.shape[1])
+        ],
+        'index': None,
+    }
+
+    index = frame.index
+    is_default_index = (
+        isinstance(index, pd.RangeIndex) and
+        index.start == 0 and index.step == 1
+    )
+    if not is_default_index:
+        meta['index'] = _write_column(index.to_series(), index.name, path,
+                                      'index')
+
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f)
+
+
+def _write_column(series, name, path, file_name):
+    column = {'name': _to_json_name(name), 'file': f'{file_name}.npy'}
+    dtype = series.dtype
+
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        column['kind'] = 'array'
+        values = np.ascontiguousarray(series.to_numpy())
+    else:
+        column['kind'] = 'categorical'
+        column['dtype'] = str(dtype)
+        try:
+            codes, categories = pd.factorize(series)
+            column['categories'] = _write_categories(categories, path,
+                                                     file_name)
+        except TypeError as e:
+            raise TypeError(f"can't store column '{name}': {e}") from None
+        values = codes.astype(np.int32)
+
+    np.save(os.path.join(path, column['file']), values, allow_pickle=False)
+    return column
+
+
+def _read_column(path, column, mmap_mode):
+    values = np.load(os.path.join(path, column['file']), mmap_mode=mmap_mode)
+    if column['kind'] == 'array':
+        return values
+
+    categories_path = os.path.join(path, column['categories'])
+    if column['categories'].endswith('.json'):
+        with open(categories_path) as f:
+            categories = pd.Index(json.load(f))
+    else:
+        categories = np.load(categories_path, allow_pickle=False)
+    values = pd.Categorical.from_codes(values, categories)
+    if column['dtype'] == 'category':
+        return values
+    if column['dtype'] == 'object':
+        return np.asarray(values, dtype=object)
+    return pd.array(np.asarray(values, dtype=object), dtype=column['dtype'])
+
+
+def _write_categories(categories, path, file_name):
+    # categories of a numeric or datetime type are stored as an array, and
+    # others, such as strings, as a JSON list. returns the file name
+    values = np.asarray(categories)
+    if values.dtype.kind in 'biufcmM':
+        file = f'{file_name}.categories.npy'
+        np.save(os.path.join(path, file), values, allow_pickle=False)
+        return file
+
+    items = [_to_json_value(value) for value in values.tolist()]
+    file = f'{file_name}.categories.json'
+    with open(os.path.join(path, file), 'w') as f:
+        json.dump(items, f)
+    return file
+
+
+def _to_json_value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"values of type '{type(value).__name__}' aren't supported "
+                    "in columns of mixed or object values")
+
+
+def _to_json_name(name):
+    # column names are stored in JSON so must be JSON serialisable
+    if name is None or isinstance(name, (str, int, float, bool)):
+        return name
+    return str(name)
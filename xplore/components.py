@@ -1,12 +1,65 @@
 import dash_html_components as html
+import dash_core_components as dcc
 from dash.development.base_component import Component
 
-from .utils import add_content
+from .utils import (add_content, LayoutIndex, set_layout_index, prefix_url,
+                    prefix_css_urls)
+from .assets import inline_file, xplore_static_path
+from .images import is_resizable, variant_url
+from .downsample import DownsampledSeries
+from .paging import PagedFrame
+from . import config
 from .exceptions import ValidationException
 
 
 VALID_COLS = set(list(range(1,13))+[None])
 
+# the src of lazily loaded images until xplore.js swaps in the real one. an
+# img without a src triggers the router callback in Dash
+PLACEHOLDER_SRC = 'data:image/gif;base64,R0lGODlhAQABAAAAACH5BAEKAAEALAAAAAABAAEAAAICTAEAOw=='
+
+
+class _DeckUrls:
+    """
+    Mixed into components whose props hold URLs on the deck's own server,
+    such as /static/img/a.png, which are given the prefix of a deck mounted
+    below the server root when they're encoded, in layouts and callback
+    output alike. Other URLs are left as they are.
+    """
+
+    _url_props = ('src', 'srcSet', 'data-xplore-src', 'data-xplore-srcset')
+
+    def to_plotly_json(self):
+        as_json = super().to_plotly_json()
+        props = as_json['props']
+        for name in self._url_props:
+            if isinstance(props.get(name), str):
+                # srcsets hold several comma separated URLs
+                props[name] = ', '.join(
+                    prefix_url(url) for url in props[name].split(', '))
+        if isinstance(props.get('style'), dict):
+            props['style'] = {
+                key: prefix_css_urls(value) if isinstance(value, str) else value
+                for key, value in props['style'].items()
+            }
+        return as_json
+
+
+class _Img(_DeckUrls, html.Img):
+    # the native loading and decoding hints, which html.Img has no props for
+    loading = 'lazy'
+
+    def to_plotly_json(self):
+        as_json = super().to_plotly_json()
+        if self.loading is not None:
+            as_json['props']['loading'] = self.loading
+        as_json['props']['decoding'] = 'async'
+        return as_json
+
+
+class _Div(_DeckUrls, html.Div):
+    pass
+
 
 def add_class(className, args_dict):
     if 'className' in args_dict:
@@ -39,10 +92,15 @@ def Box(children=None, center=False, **kwargs):
 
 
 def BackgroundImage(children=None, src=None, **kwargs):
-    return html.Div(
+    # backgrounds cover the viewport, so use the largest variant
+    url = f'/static/img/{src}'
+    if is_resizable(src):
+        url = variant_url(f'img/{src}', max(config.IMAGE_WIDTHS))
+
+    return _Div(
         children=children,
         style={
-            'background': f'url("/static/img/{src}") center center / cover no-repeat fixed',
+            'background': f'url("{url}") center center / cover no-repeat fixed',
             'position': 'fixed',
             'height': '100vh',
             'width': '100vw',
@@ -52,24 +110,138 @@ def BackgroundImage(children=None, src=None, **kwargs):
         **kwargs)
 
 
-def Image(src=None, round=False, width=None, **kwargs):
+def Image(src=None, round=False, width=None, sizes=None, lazy=False,
+          loading='lazy', **kwargs):
     styles = {
         'width': '100%',
         'height': 'auto',
     }
+    # the width of the image relative to the viewport, for the sizes attr
+    viewport_width = 100
 
     if round:
         styles['border-radius'] = '10px'
     if width is not None:
         if isinstance(width, int) or (isinstance(width, str) and width.isdigit()): 
             styles['width'] = f'{width}%'
+            viewport_width = int(width)
         elif isinstance(width, str):
             styles['width'] = width
         else:
             raise ValidationException("'width' must be an integer or a string")    
         
     add_base_styles(styles, kwargs)
-    return html.Img(src=f'/static/img/{src}', **kwargs)
+
+    url = f'/static/img/{src}'
+    srcset = None
+    if is_resizable(src):
+        # let the browser choose the smallest variant that fills the image
+        srcset = ', '.join(f'{variant_url(f"img/{src}", size)} {size}w'
+                           for size in config.IMAGE_WIDTHS)
+        kwargs['sizes'] = sizes if sizes is not None else f'{viewport_width}vw'
+
+    if lazy:
+        # xplore.js loads the image when it nears the viewport, so clients
+        # without JavaScript only see the placeholder. the data attributes
+        # are set after creation because Dash orders attributes passed as
+        # kwargs differently from run to run, which would change the
+        # encoded layout
+        image = _Img(src=PLACEHOLDER_SRC, **kwargs)
+        setattr(image, 'data-xplore-src', url)
+        if srcset is not None:
+            setattr(image, 'data-xplore-srcset', srcset)
+    else:
+        if srcset is not None:
+            kwargs['srcSet'] = srcset
+        image = _Img(src=url, **kwargs)
+
+    # browsers defer loading offscreen images themselves. images that are
+    # on screen when the page opens can pass loading='eager' or None
+    image.loading = loading
+    return image
+
+
+def DownsampledGraph(id, x, y, width=None, method='lttb', mode='lines',
+                     layout=None, **kwargs):
+    """
+    A Graph of one or more long series sharing the same x values, eg
+    DownsampledGraph('prices', df.index, {'open': df.open, 'close': df.close}).
+    The full series are kept on the server and the browser is sent them
+    downsampled to about width points, by the 'lttb' (Largest-Triangle-
+    Three-Buckets) or 'minmax' method. Register the graph with the Block's
+    add_downsampling in its callbacks method to re-downsample the visible
+    range when the graph is zoomed.
+    """
+    series = DownsampledSeries(x, y, width=width, method=method,
+                               trace={'mode': mode, 'type': 'scatter'})
+    figure = {
+        'data': series.traces(),
+        'layout': layout if layout is not None else {},
+    }
+    graph = dcc.Graph(id=id, figure=figure, **kwargs)
+    # attributes that aren't Dash props are ignored when encoding
+    graph._downsampled_series = series
+    return graph
+
+
+def PagedTable(id, frame, page_size=20, columns=None, **kwargs):
+    """
+    A table of the rows of a DataFrame that is filtered, sorted and paged
+    on the server, so that only one page of rows is ever sent to the
+    browser, however large the frame. Register the table with the Block's
+    add_paging in its callbacks method.
+    """
+    paged = PagedFrame(frame, page_size=page_size, columns=columns)
+    controls = html.Div([
+        dcc.Input(id=f'{id}-filter', type='text', value='', placeholder='Filter'),
+        dcc.Dropdown(
+            id=f'{id}-sort',
+            options=[{'label': str(column), 'value': column}
+                     for column in paged.columns],
+            placeholder='Sort by'
+        ),
+        dcc.RadioItems(
+            id=f'{id}-order',
+            options=[{'label': 'Ascending', 'value': 'asc'},
+                     {'label': 'Descending', 'value': 'desc'}],
+            value='asc'
+        ),
+    ], className='paged-table-controls')
+    pager = html.Div([
+        'Page ',
+        dcc.Input(id=f'{id}-page', type='number', value=1, min=1),
+    ], className='paged-table-pager')
+
+    rows = html.Div(table_page(paged, *paged.get_page()), id=f'{id}-rows')
+    add_class('paged-table', kwargs)
+    table = html.Div([controls, rows, pager], id=id, **kwargs)
+    # attributes that aren't Dash props are ignored when encoding
+    table._paged_frame = paged
+    return table
+
+
+def table_page(paged, rows, row_count, page):
+    """Returns the components showing a page of a PagedTable's rows"""
+    header = html.Thead(html.Tr([html.Th(str(column)) for column in paged.columns]))
+    body = html.Tbody([
+        html.Tr([html.Td(_format_cell(value)) for value in row])
+        for row in rows.itertuples(index=False, name=None)
+    ])
+    if row_count:
+        first = (page - 1) * paged.page_size + 1
+        summary = 'Rows {}-{} of {}, page {} of {}'.format(
+            first, first + len(rows) - 1, row_count, page,
+            paged.page_count(row_count))
+    else:
+        summary = 'No rows'
+    return [html.Table([header, body], className='table table-sm'),
+            html.Small(summary)]
+
+
+def _format_cell(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return str(value)
 
 
 def Col(children=None, size=None, **kwargs):
@@ -107,6 +279,9 @@ def Row(content=None, shape=None, start_id=1, hcenter=False, col_classes=None, *
         col_classes.append('d-flex')
         col_classes.append('justify-content-center')
 
+    # index the content-ID elements as they're created, so that content can
+    # be added without searching the tree for them
+    index = LayoutIndex()
     col_list = []
     for i, size in enumerate(shape):
         # note that we intentionally embed the content-id one extra div so
@@ -121,10 +296,12 @@ def Row(content=None, shape=None, start_id=1, hcenter=False, col_classes=None, *
             className=' '.join(col_classes if col_classes else [])
         )
         col_list.append(col)
+        index.add(f'content-{content_id}', col)
 
     kwargs['children'] = col_list
     add_class('row', kwargs)        
     row = html.Div(**kwargs)
+    set_layout_index(row, index)
 
     if content is not None:
         add_content(row, content)
@@ -137,8 +314,8 @@ def Link(href, text, **kwargs):
 
 
 def left_right_nav(left=None, right=None, **kwargs):
-    next_link = html.Div(left, id='next-page')
-    prev_link = html.Div(right, id='prev-page')
+    next_link = _Div(left, id='next-page')
+    prev_link = _Div(right, id='prev-page')
 
     chevron_size = 2 # em
     chevron_area = 2*chevron_size
@@ -149,20 +326,34 @@ def left_right_nav(left=None, right=None, **kwargs):
         'backgroundSize': '{}em'.format(chevron_size),
     }
 
-    # TODO use STATIC_URL_PATH here
-
     if left is None:
         prev_link.style = {
-            'background': 'url(/static/xplore/svg/left_arrow.svg)',
+            'background': _static_image_url('svg/left_arrow.svg'),
             'backgroundPosition': 'left top',
             **shared_styles
         }
 
     if right is None:
         next_link.style = {
-            'background': 'url(/static/xplore/svg/right_arrow.svg)',
+            'background': _static_image_url('svg/right_arrow.svg'),
             'backgroundPosition': 'right top',
             **shared_styles
         }
 
-    return html.Div([prev_link, next_link], **kwargs)
+    nav = html.Div([prev_link, next_link], **kwargs)
+    index = LayoutIndex()
+    index.add('prev-page', nav, 0)
+    index.add('next-page', nav, 1)
+    set_layout_index(nav, index)
+    return nav
+
+
+def _static_image_url(path):
+    # a CSS url() for an image in xplore's static folder, inlined as a data
+    # URI when it's small enough to save the request
+    data_uri = inline_file(xplore_static_path(path))
+    if data_uri is not None:
+        return f'url("{data_uri}")'
+
+    # TODO use STATIC_URL_PATH here
+    return f'url(/static/xplore/{path})'
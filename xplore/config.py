@@ -4,9 +4,60 @@ PAGE_ELEMENT_ID = 'page'
 # element ID that the navbar will be inserted into
 NAVBAR_ELEMENT_ID = 'navbar'
 
+# element ID of the script tag that xplore's client side config is embedded in
+CLIENT_CONFIG_ELEMENT_ID = '_xplore-config'
+
 # The path to xplore's static files
 STATIC_PATH = 'static'
 
+# The URL that runtime metrics are served from, when enabled
+METRICS_URL = '/_xplore/metrics'
+
+# The max-age, in seconds, that xplore's static files are served with. If 0,
+# browsers revalidate them on every use, which costs a 304 response
+STATIC_MAX_AGE = 0
+
+# The URL that bundled CSS and JS assets are served from, when bundle_assets
+# is set. CSS bundles are minified, while JS files are only concatenated
+BUNDLE_URL = '/_xplore/bundles'
+
+# The URL that an XploreHost serves its report on the decks it hosts from
+HOST_REPORT_URL = '/_xplore/decks'
+
+# Images no larger than this many bytes are inlined as data URIs, both in
+# asset bundles and in xplore's own components
+INLINE_ASSET_MAX_BYTES = 4096
+
+# The URL that resized variants of images in the static folder are served
+# from, and the widths of the variants
+IMAGE_URL = '/_xplore/img'
+IMAGE_WIDTHS = [480, 960, 1440, 1920]
+
+# The directory, relative to the project path, that image variants are
+# cached in
+IMAGE_CACHE_PATH = '.xplore_images'
+
+# The width, in pixels, that DownsampledGraphs assume their plot area is
+# when no width is given. Series are downsampled to about one point per pixel
+DOWNSAMPLE_WIDTH = 1000
+
+# Numeric arrays shorter than this are left as JSON lists by Blocks with a
+# figure_encoding, as packing them saves little
+ENCODE_ARRAY_MIN_LENGTH = 32
+
+# The directory that Block data shared between processes is stored in, which
+# must only be accessible to the user running the server. If None, a
+# directory for the user in /dev/shm is used where available, otherwise in
+# the temp directory
+SHARED_DATA_PATH = None
+
+# The directory, relative to the project path, that Block data is cached in
+DATA_CACHE_PATH = '.xplore_cache'
+
+# How often, in seconds, the data sources of Blocks with refresh_on_change
+# set are checked for changes
+REFRESH_POLL_INTERVAL = 5
+
 
 # The generated routes for CSS_FILES and JS_FILES will be prefixed with the
 # value of the static url path unless they begin with 'http'
@@ -23,4 +74,5 @@ JS_FILES = [
     'xplore/js/jquery-3.2.1.slim.min.js',
     'xplore/js/popper.min.js',
     'xplore/js/bootstrap.min.js',
+    'xplore/js/xplore.js',
 ]
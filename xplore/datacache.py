@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+
+from .columnar import write_frame, read_frame, is_frame
+from .datastore import _FileLock
+
+
+SOURCES_FILE = 'sources.json'
+FRAME_DIR = 'frame'
+
+
+class DataCache:
+    """
+    An on-disk cache of the frames loaded by Blocks' get_data methods, stored
+    in xplore's columnar format so that they can be loaded much faster than
+    they can be parsed from their sources.
+
+    Each entry records the size, modification time and content hash of the
+    source files it was loaded from, along with a hash of the loading code.
+    An entry is used only while all of these still match. The content hash
+    is only computed when the size or modification time has changed, so
+    that touching a file without changing it doesn't invalidate the cache.
+
+    Entries are checked and written under a lock per key, so processes
+    starting at the same time load each entry once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def get(self, key, sources, loader, code=''):
+        """
+        Returns the frame stored under key, calling loader to create it if
+        there is no valid entry. sources is a list of paths to the files that
+        loader reads and code is a string identifying the loading code.
+        """
+        entry_path = os.path.join(self.path, key)
+        os.makedirs(self.path, exist_ok=True)
+        with _FileLock(os.path.join(self.path, f'{key}.lock')):
+            if self._is_valid(entry_path, sources, code):
+                return read_frame(os.path.join(entry_path, FRAME_DIR),
+                                  mmap_mode='c')
+
+            frame = loader()
+            write_frame(frame, os.path.join(entry_path, FRAME_DIR))
+            stamps = {
+                'code': _hash_string(code),
+                'created': time.time(),
+                'sources': {path: _stamp(path) for path in sources},
+            }
+            _write_stamps(entry_path, stamps)
+        return frame
+
+    def entries(self):
+        """Returns a list of dicts describing each entry in the cache"""
+        if not os.path.isdir(self.path):
+            return []
+
+        entries = []
+        for key in sorted(os.listdir(self.path)):
+            entry_path = os.path.join(self.path, key)
+            if not self._is_entry(key):
+                continue
+            stamps = _read_stamps(entry_path)
+            entries.append({
+                'key': key,
+                'created': stamps['created'],
+                'size': _get_tree_size(entry_path),
+                'sources': list(stamps['sources']),
+                'stale': not self._sources_match(entry_path, stamps),
+            })
+        return entries
+
+    def clear(self, key=None):
+        """
+        Removes the entry for key, or all entries if key is None. Raises
+        KeyError if there is no entry for key. Only entries are removed, so
+        other files in the cache directory, and the directory itself, are
+        left alone.
+        """
+        if key is None:
+            keys = os.listdir(self.path) if os.path.isdir(self.path) else []
+            for key in keys:
+                if self._is_entry(key):
+                    shutil.rmtree(os.path.join(self.path, key))
+            return
+
+        if not self._is_entry(key):
+            raise KeyError(key)
+        shutil.rmtree(os.path.join(self.path, key))
+
+    def _is_entry(self, key):
+        # keys name entries directly within the cache directory. anything
+        # else, such as a path, could delete files outside it
+        entry_path = os.path.join(self.path, key)
+        return not (key in ('', '.', '..') or os.path.basename(key) != key or
+                    os.path.islink(entry_path) or
+                    _read_stamps(entry_path) is None)
+
+    def _is_valid(self, entry_path, sources, code):
+        stamps = _read_stamps(entry_path)
+        if stamps is None or not is_frame(os.path.join(entry_path, FRAME_DIR)):
+            return False
+        if stamps['code'] != _hash_string(code):
+            return False
+        if sorted(stamps['sources']) != sorted(sources):
+            return False
+        return self._sources_match(entry_path, stamps)
+
+    def _sources_match(self, entry_path, stamps):
+        updated = False
+        for path, stamp in stamps['sources'].items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            if (stat.st_size, stat.st_mtime_ns) == (stamp['size'], stamp['mtime']):
+                continue
+            # the file has been touched; check whether it actually changed
+            if _hash_file(path) != stamp['hash']:
+                return False
+            stamps['sources'][path] = _stamp(path)
+            updated = True
+
+        if updated:
+            _write_stamps(entry_path, stamps)
+        return True
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'hash': _hash_file(path),
+    }
+
+
+def _hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024*1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _hash_string(string):
+    return hashlib.sha256(string.encode('utf-8')).hexdigest()
+
+
+def _read_stamps(entry_path):
+    try:
+        with open(os.path.join(entry_path, SOURCES_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_stamps(entry_path, stamps):
+    # write then rename so that readers never see a partial file
+    tmp_path = os.path.join(entry_path, f'.{SOURCES_FILE}.{os.getpid()}')
+    with open(tmp_path, 'w') as f:
+        json.dump(stamps, f)
+    os.replace(tmp_path, os.path.join(entry_path, SOURCES_FILE))
+
+
+def _get_tree_size(path):
+    return sum(
+        os.path.getsize(os.path.join(current, name))
+        for current, _, files in os.walk(path)
+        for name in files
+    )
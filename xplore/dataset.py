@@ -0,0 +1,88 @@
+import numpy as np
+
+
+class IndexedFrame:
+    """
+    Wraps a DataFrame with precomputed group indices on a set of key
+    columns, so that the rows matching given key values can be sliced out in
+    time proportional to the size of the slice, rather than by scanning every
+    row with a boolean mask.
+
+    Blocks can return these from get_data in place of a DataFrame. Anything
+    other than select is passed through to the wrapped frame, so existing
+    code such as df['Year'].unique() keeps working.
+
+        df = IndexedFrame(frame, keys=['Year', 'Indicator Name'])
+        dff = df.select({'Year': 2007, 'Indicator Name': 'GDP growth (annual %)'})
+    """
+
+    def __init__(self, frame, keys):
+        self.frame = frame
+        self.keys = list(keys)
+
+        # an index for each key column, plus one on all the key columns
+        # together, which is what the common case of selecting on every key
+        # will use
+        self._indices = {
+            (key,): self._build_index([key]) for key in self.keys
+        }
+        self._indices[tuple(self.keys)] = self._build_index(self.keys)
+
+    def _build_index(self, columns):
+        # maps each value (or tuple of values) of the columns to the sorted
+        # positions of the rows that hold it
+        by = columns[0] if len(columns) == 1 else columns
+        groups = self.frame.groupby(by, sort=False, observed=True)
+        return {
+            (value if len(columns) > 1 else (value,)): positions
+            for value, positions in groups.indices.items()
+        }
+
+    def select(self, where=None, **kwargs):
+        """
+        Returns a DataFrame of the rows whose key columns have the given
+        values, supplied either as a dict or as keyword arguments.
+        """
+        where = dict(where or {}, **kwargs)
+        unknown = set(where) - set(self.keys)
+        if unknown:
+            raise KeyError(f"Not key columns: {', '.join(map(str, unknown))}")
+
+        return self.frame.iloc[self.positions(where)]
+
+    def positions(self, where):
+        """Returns the positions of the rows matching the dict where"""
+        columns = tuple(key for key in self.keys if key in where)
+        values = tuple(where[key] for key in columns)
+
+        if not columns:
+            return np.arange(len(self.frame))
+
+        if columns in self._indices:
+            return self._indices[columns].get(values, np.array([], dtype=int))
+
+        # intersect the rows for each column, starting with the smallest
+        matches = sorted(
+            (self._indices[(column,)].get((value,), np.array([], dtype=int))
+             for column, value in zip(columns, values)),
+            key=len
+        )
+        positions = matches[0]
+        for other in matches[1:]:
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+    def __getattr__(self, name):
+        if name == 'frame':
+            # not yet set, eg while unpickling
+            raise AttributeError(name)
+        return getattr(self.frame, name)
+
+    def __getitem__(self, key):
+        return self.frame[key]
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __repr__(self):
+        return f'IndexedFrame(keys={self.keys!r})\n{self.frame!r}'
@@ -0,0 +1,153 @@
+import os
+import stat
+import shutil
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, where loads are not serialised
+    fcntl = None
+
+from . import config
+from .columnar import write_frame, read_frame, is_frame
+
+
+class DataStore:
+    """
+    A store of DataFrames that are shared between the processes serving an
+    Xplorable, such as the workers of a gunicorn server.
+
+    The first process to request a key runs its loader and writes the result
+    to a memory-mapped columnar file. Every process then gets a read-only
+    view onto that file, so the data lives in memory once no matter how many
+    workers there are.
+
+    Frames are shared between processes in the same process group, which is
+    what a server's workers have in common. A new server gets a new process
+    group, so it always loads fresh data. Use clear() to force a reload
+    within a running server.
+
+    The store is kept in a directory that only the current user can access,
+    which is checked before use, as the default location is shared with
+    other users.
+    """
+
+    def __init__(self, path=None, namespace=None):
+        if path is None:
+            path = config.SHARED_DATA_PATH
+        if path is None:
+            # /dev/shm is memory-backed, so files there never touch the disk
+            base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+            user = os.getuid() if hasattr(os, 'getuid') else 'user'
+            path = os.path.join(base, f'xplore-{user}')
+
+        if namespace is None:
+            namespace = self._get_namespace()
+
+        self.base_path = path
+        self.path = os.path.join(path, namespace)
+        _make_private_dir(self.base_path)
+        _make_private_dir(self.path)
+        self._remove_stale_namespaces()
+
+    def get(self, key, loader):
+        """
+        Returns the frame stored under key, calling loader to create it if no
+        process has yet done so. loader must return a DataFrame or a dict of
+        DataFrames.
+        """
+        frame_path = os.path.join(self.path, key)
+        if not is_frame(frame_path):
+            with self._lock(key):
+                # another process may have loaded it while we waited
+                if not is_frame(frame_path):
+                    write_frame(loader(), frame_path)
+        return read_frame(frame_path)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        _make_private_dir(self.path)
+
+    def _lock(self, key):
+        return _FileLock(os.path.join(self.path, f'{key}.lock'))
+
+    @staticmethod
+    def _get_namespace():
+        # the process group plus its leader's start time, so that a reused
+        # group ID doesn't pick up a dead server's data
+        group_id = os.getpgrp()
+        return f'{group_id}-{_get_start_time(group_id)}'
+
+    def _remove_stale_namespaces(self):
+        # remove data left behind by this user's servers that are no longer
+        # running
+        for namespace in os.listdir(self.base_path):
+            group_id, _, start_time = namespace.partition('-')
+            if not group_id.isdigit():
+                continue
+            namespace_path = os.path.join(self.base_path, namespace)
+            if not _is_owned_dir(namespace_path):
+                continue
+            if _get_start_time(int(group_id)) != start_time:
+                shutil.rmtree(namespace_path, ignore_errors=True)
+
+
+class _FileLock:
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.file = open(self.path, 'w')
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+def _make_private_dir(path):
+    # creates the directory, readable only by the current user, or checks
+    # that an existing one is, so that another user can't read the data or
+    # plant files in it
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if not hasattr(os, 'getuid'):
+        return
+    if not _is_owned_dir(path):
+        raise PermissionError(
+            f"'{path}' is not a directory owned by the current user")
+    if stat.S_IMODE(os.lstat(path).st_mode) & 0o077:
+        raise PermissionError(
+            f"'{path}' must not be accessible to other users (mode 0o700)")
+
+
+def _is_owned_dir(path):
+    # symlinks are never trusted, as they can point anywhere
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(info.st_mode):
+        return False
+    return not hasattr(os, 'getuid') or info.st_uid == os.getuid()
+
+
+def _get_start_time(pid):
+    # the start time of a process, or an empty string if it isn't running or
+    # this can't be determined
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # the command name can contain spaces, so split after it
+            return f.read().rpartition(')')[2].split()[19]
+    except (OSError, IndexError):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return ''
+        except OSError:
+            pass
+        return 'running'
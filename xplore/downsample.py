@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+from . import config
+from .exceptions import ValidationException
+
+
+# the number of points per pixel of plot width that each method returns. the
+# min/max method keeps two points per pixel so that spikes aren't lost
+POINTS_PER_PIXEL = {
+    'lttb': 1,
+    'minmax': 2,
+}
+
+
+def lttb(x, y, n):
+    """
+    Returns the indices of n points of the series x, y chosen by the
+    Largest-Triangle-Three-Buckets algorithm, which keeps the visual shape of
+    a line. x must be sorted and numeric. The first and last points are
+    always kept.
+    """
+    length = len(x)
+    if n >= length or n < 3:
+        return np.arange(length)
+
+    # n - 2 buckets between the first and last points
+    edges = np.linspace(1, length - 1, n - 1).astype(np.intp)
+    indices = np.empty(n, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = length - 1
+
+    selected = 0
+    for i in range(n - 2):
+        start, end = edges[i], edges[i + 1]
+        if i < n - 3:
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = length - 1, length
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        # the point in the bucket forming the largest triangle with the last
+        # selected point and the average of the next bucket
+        ax, ay = x[selected], y[selected]
+        areas = np.abs((ax - next_x) * (y[start:end] - ay) -
+                       (ax - x[start:end]) * (next_y - ay))
+        selected = start + int(np.argmax(areas)) if end > start else start
+        indices[i + 1] = selected
+    return indices
+
+
+def min_max(y, n):
+    """
+    Returns the indices of about n points of the series y, being the minimum
+    and maximum of each of n/2 equal buckets, in order. Unlike LTTB this is
+    guaranteed to keep every peak and trough. The first and last points are
+    always kept.
+    """
+    length = len(y)
+    buckets = n // 2
+    if n >= length or buckets < 1:
+        return np.arange(length)
+
+    edges = np.linspace(0, length, buckets + 1).astype(np.intp)
+    indices = {0, length - 1}
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        bucket = y[start:end]
+        low, high = start + int(np.argmin(bucket)), start + int(np.argmax(bucket))
+        indices.update((low, high))
+    return np.array(sorted(indices), dtype=np.intp)
+
+
+def parse_relayout(relayout_data, axis='xaxis'):
+    """
+    Returns the range of the axis reported by a graph's relayoutData, as a
+    (start, end) pair, or None if the axis was reset to its full range.
+    Returns False if the relayout didn't change the axis.
+    """
+    if not relayout_data:
+        return False
+    if relayout_data.get(f'{axis}.autorange'):
+        return None
+    if f'{axis}.range[0]' in relayout_data and f'{axis}.range[1]' in relayout_data:
+        return relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]']
+    if f'{axis}.range' in relayout_data:
+        start, end = relayout_data[f'{axis}.range']
+        return start, end
+    return False
+
+
+class DownsampledSeries:
+    """
+    The full x values of a graph along with one or more y series, kept on
+    the server so that only a downsampled version needs to be sent to the
+    browser, however many points there are.
+
+    x must be sorted. Datetime x values are supported, and are compared with
+    the date strings that plotly reports for zoomed ranges.
+    """
+
+    def __init__(self, x, y, width=None, method='lttb', trace=None):
+        if method not in POINTS_PER_PIXEL:
+            msg = "'method' param must be {}".format(
+                ' or '.join(f"'{name}'" for name in POINTS_PER_PIXEL))
+            raise ValidationException(msg)
+        self.method = method
+        self.width = config.DOWNSAMPLE_WIDTH if width is None else width
+        # the properties shared by each trace, eg its mode and line style
+        self.trace = trace if trace is not None else {}
+
+        self.x = _to_array(x)
+        self.is_datetime = np.issubdtype(self.x.dtype, np.datetime64)
+        # numeric x values, used for the triangle areas and range lookups
+        self._x = self.x.astype('datetime64[ns]').astype(np.int64) \
+            if self.is_datetime else self.x.astype(float)
+        if (np.diff(self._x) < 0).any():
+            raise ValidationException("'x' must be sorted")
+
+        if not isinstance(y, dict):
+            y = {None: y}
+        self.y = {name: _to_array(values).astype(float) for name, values in y.items()}
+        for values in self.y.values():
+            if len(values) != len(self.x):
+                raise ValidationException("'x' and 'y' must be the same length")
+
+    @property
+    def max_points(self):
+        return int(self.width * POINTS_PER_PIXEL[self.method])
+
+    def downsample(self, x_range=None):
+        """
+        Returns a dict of (x, y) arrays, keyed by the name of each series,
+        downsampled to the width of the plot, for the whole series or just
+        the points within x_range, a (start, end) pair.
+        """
+        start, end = self._get_bounds(x_range)
+        x = self._x[start:end]
+        selected = {}
+        for name, y in self.y.items():
+            y = y[start:end]
+            if self.method == 'lttb':
+                indices = lttb(x, y, self.max_points)
+            else:
+                indices = min_max(y, self.max_points)
+            selected[name] = indices
+
+        # series downsampled separately choose different x values, so each
+        # gets its own
+        return {
+            name: (self.x[start:end][indices], self.y[name][start:end][indices])
+            for name, indices in selected.items()
+        }
+
+    def traces(self, x_range=None):
+        """Returns the downsampled series as a list of plotly traces"""
+        traces = []
+        for name, (x, y) in self.downsample(x_range).items():
+            trace = dict(self.trace, x=x, y=y)
+            if name is not None:
+                trace['name'] = name
+            traces.append(trace)
+        return traces
+
+    def _get_bounds(self, x_range):
+        # the slice of points within x_range, plus one point either side so
+        # that lines run to the edges of the plot
+        if x_range is None:
+            return 0, len(self._x)
+        low, high = sorted(self._convert(value) for value in x_range)
+        start = max(int(np.searchsorted(self._x, low, side='left')) - 1, 0)
+        end = min(int(np.searchsorted(self._x, high, side='right')) + 1, len(self._x))
+        return start, end
+
+    def _convert(self, value):
+        if self.is_datetime:
+            return pd.Timestamp(value).value
+        return float(value)
+
+
+def _to_array(values):
+    if isinstance(values, (pd.Series, pd.Index)):
+        return values.to_numpy()
+    return np.asarray(values)
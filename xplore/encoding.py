@@ -0,0 +1,113 @@
+import base64
+
+import numpy as np
+import pandas as pd
+from plotly.basedatatypes import BaseFigure, BasePlotlyType
+
+from . import config
+from .exceptions import ValidationException
+
+
+# the key of the objects that packed arrays are sent as, which xplore.js
+# replaces with typed arrays
+ARRAY_KEY = '__xplore_array__'
+
+# 'binary' packs numeric arrays at their own precision, 'float32' downcasts
+# floats to 32 bits, and 'quantize' maps floats to 16 bit steps between
+# their minimum and maximum
+FIGURE_ENCODINGS = ('binary', 'float32', 'quantize')
+
+# the dtypes that JavaScript has typed arrays for
+TYPED_ARRAY_DTYPES = {'int8', 'int16', 'int32', 'uint8', 'uint16', 'uint32',
+                      'float32', 'float64'}
+
+# quantized values take the steps below this, which marks missing values
+QUANTIZE_MISSING = np.iinfo(np.uint16).max
+
+
+def check_figure_encoding(figure_encoding):
+    if figure_encoding is not None and figure_encoding not in FIGURE_ENCODINGS:
+        msg = "'figure_encoding' param must be None, {}".format(
+            ' or '.join(f"'{encoding}'" for encoding in FIGURE_ENCODINGS))
+        raise ValidationException(msg)
+
+
+def encode_figure(figure, encoding):
+    """
+    Returns the figure, a dict or plotly Figure, with its numeric arrays of
+    at least config.ENCODE_ARRAY_MIN_LENGTH values replaced by base64 packed
+    typed arrays, which are smaller and much quicker to encode than JSON
+    lists of numbers. Plotly objects within it, such as go.Scatter traces
+    in a dict figure, are converted to dicts first. Other values are left
+    for Dash to encode as usual.
+    """
+    return _encode(figure, encoding)
+
+
+def _encode(value, encoding):
+    if isinstance(value, (BaseFigure, BasePlotlyType)):
+        value = value.to_plotly_json()
+    if isinstance(value, dict):
+        return {key: _encode(item, encoding) for key, item in value.items()}
+    if isinstance(value, (pd.Series, pd.Index)):
+        value = value.to_numpy()
+    if isinstance(value, (list, tuple)):
+        if len(value) >= config.ENCODE_ARRAY_MIN_LENGTH and _is_numeric_list(value):
+            return pack_array(np.asarray(value), encoding)
+        return [_encode(item, encoding) for item in value]
+    if isinstance(value, np.ndarray):
+        if value.ndim > 1:
+            # eg the z values of a heatmap, which are sent row by row
+            return [_encode(row, encoding) for row in value]
+        if len(value) >= config.ENCODE_ARRAY_MIN_LENGTH and value.dtype.kind in 'iuf':
+            return pack_array(value, encoding)
+    return value
+
+
+def _is_numeric_list(values):
+    # bools are ints to Python, but plotly treats them differently
+    return all(isinstance(value, (int, float, np.integer, np.floating)) and
+               not isinstance(value, (bool, np.bool_))
+               for value in values)
+
+
+def pack_array(array, encoding):
+    """Returns the object that a 1D numeric array is sent as"""
+    packed = {}
+    if array.dtype.kind == 'f':
+        if encoding == 'quantize':
+            array, packed['offset'], packed['scale'] = _quantize(array)
+        elif encoding == 'float32' or array.dtype.itemsize < 4:
+            array = array.astype(np.float32)
+    elif array.dtype.name not in TYPED_ARRAY_DTYPES:
+        # 64 bit ints, which have no typed array that plotly.js accepts
+        info = np.iinfo(np.int32)
+        if len(array) and (array.min() < info.min or array.max() > info.max):
+            array = array.astype(np.float64)
+        else:
+            array = array.astype(np.int32)
+
+    # typed arrays use the byte order of the browser, which is little
+    # endian on every platform plotly.js supports
+    array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+    packed['dtype'] = array.dtype.name
+    packed['data'] = base64.b64encode(array.tobytes()).decode('ascii')
+    return {ARRAY_KEY: packed}
+
+
+def _quantize(array):
+    # maps the finite values to 16 bit steps between their minimum and
+    # maximum, which are restored as offset + step * scale
+    finite = np.isfinite(array)
+    if not finite.any():
+        return np.full(len(array), QUANTIZE_MISSING, dtype=np.uint16), 0.0, 0.0
+
+    low = float(array[finite].min())
+    high = float(array[finite].max())
+    scale = (high - low) / (QUANTIZE_MISSING - 1)
+    steps = np.full(len(array), QUANTIZE_MISSING, dtype=np.uint16)
+    if scale > 0:
+        steps[finite] = np.rint((array[finite] - low) / scale)
+    else:
+        steps[finite] = 0
+    return steps, low, scale
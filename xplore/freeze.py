@@ -0,0 +1,310 @@
+import os
+import json
+import shutil
+import itertools
+
+from dash.development.base_component import Component
+from dash.exceptions import PreventUpdate
+
+from . import config
+from .staticfiles import CompressedFile, guess_type
+from .images import is_resizable
+
+
+# directory within a frozen deck containing the pre-rendered responses
+FROZEN_PATH = '_xplore'
+
+# callbacks whose inputs have more combinations than this are not frozen
+MAX_COMBINATIONS = 1000
+
+# the characters that are kept as they are in the file names of routes
+ROUTE_FILE_NAME_CHARS = frozenset(
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-')
+
+
+def freeze(xplorable, output_path, max_combinations=MAX_COMBINATIONS,
+           precompress=False):
+    """
+    Writes a static version of an Xplorable to output_path that can be served
+    by any web server, without Python.
+
+    Every route is pre-rendered, as are callbacks whose inputs all come from
+    components with a small finite set of values (eg dropdowns, radio items
+    and sliders), which are precomputed into lookup tables. Other callbacks
+    are not available in the frozen deck. Returns a report dict listing the
+    frozen and skipped callbacks, the callbacks that raised errors for some
+    combinations of inputs, which are left out of their tables, and any CSS
+    and JS files that could not be found in the static folders.
+
+    If precompress is true, gzip and brotli compressed copies of each file
+    are written alongside it, for servers that can serve them directly, eg
+    with nginx's gzip_static.
+    """
+    os.makedirs(output_path, exist_ok=True)
+    client = xplorable.app.server.test_client()
+
+    _freeze_index(xplorable, client, output_path)
+    missing_assets = _freeze_static(xplorable, output_path)
+    _freeze_images(xplorable, output_path)
+    _freeze_routes(xplorable, output_path)
+    report = _freeze_callbacks(xplorable, output_path, max_combinations)
+    report['missing_assets'] = missing_assets
+
+    if precompress:
+        _precompress_tree(output_path)
+    return report
+
+
+def route_file_name(route):
+    # must match frozenRouteUrl in xplore.js. routes are flattened into a
+    # single file name, with each UTF-8 byte other than a letter, digit, '_'
+    # or '-' written as '~' and its hex code, so that the name needs no
+    # escaping in a URL. escaped slashes are rejected or decoded by some
+    # servers
+    name = route.strip('/')
+    if name == '':
+        return '_index'
+    return ''.join(
+        chr(byte) if chr(byte) in ROUTE_FILE_NAME_CHARS else f'~{byte:02X}'
+        for byte in name.encode('utf-8')
+    )
+
+
+def _write_json(path, obj):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f)
+
+
+def _freeze_index(xplorable, client, output_path):
+    # the index page is written once per route so that deep links can be
+    # served with a rule like nginx's `try_files $uri $uri.html`
+    index = client.get('/').get_data(as_text=True)
+    index = index.replace(
+        xplorable.client_config_html(),
+        xplorable.client_config_html(frozen=True)
+    )
+    for route in xplorable.all_routes:
+        name = 'index' if route == '/' else route.strip('/')
+        path = os.path.join(output_path, f'{name}.html')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(index)
+
+    # Dash's own endpoints are requested with a .json extension by a frozen
+    # deck, so that static servers give them the right content type
+    for endpoint in ('_dash-layout', '_dash-dependencies'):
+        body = client.get(f'/{endpoint}').get_data(as_text=True)
+        with open(os.path.join(output_path, f'{endpoint}.json'), 'w') as f:
+            f.write(body)
+
+
+def _freeze_static(xplorable, output_path):
+    server = xplorable.app.server
+    static_url = server.static_url_path.strip('/')
+    static_path = os.path.join(output_path, static_url)
+
+    if server.static_folder is not None and os.path.isdir(server.static_folder):
+        _copy_tree(server.static_folder, static_path)
+
+    _copy_tree(
+        os.path.join(xplorable.xplore_base_path, config.STATIC_PATH),
+        os.path.join(static_path, 'xplore')
+    )
+
+    for bundle in xplorable.bundles.values():
+        bundle_path = os.path.join(output_path, config.BUNDLE_URL.strip('/'),
+                                   bundle.name)
+        os.makedirs(os.path.dirname(bundle_path), exist_ok=True)
+        with open(bundle_path, 'wb') as f:
+            f.write(bundle.body)
+
+    # the collected CSS and JS files should all be within the static folders
+    assets = itertools.chain(xplorable.all_css_files, xplorable.all_js_files)
+    return [
+        asset_path for asset_path in assets
+        if not asset_path.startswith('http') and
+        not os.path.exists(os.path.join(static_path, asset_path))
+    ]
+
+
+def _freeze_images(xplorable, output_path):
+    # static servers can't choose between formats by the Accept header, so
+    # only the variants in the original format are written. the original
+    # is used wherever there's no variant, eg without Pillow
+    images = xplorable.images
+    static_folder = xplorable.app.server.static_folder
+    if static_folder is None or not os.path.isdir(static_folder):
+        return
+
+    for current, _, files in os.walk(static_folder):
+        for name in files:
+            source_path = os.path.join(current, name)
+            src = os.path.relpath(source_path, static_folder)
+            if not is_resizable(src):
+                continue
+            for width in config.IMAGE_WIDTHS:
+                variant_path = None
+                if images.can_resize:
+                    variant_path = images.get_variant(src, width)
+                target = os.path.join(output_path, config.IMAGE_URL.strip('/'),
+                                      str(width), src)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(variant_path or source_path, target)
+
+
+def _copy_tree(source, destination):
+    # like shutil.copytree, but merges into an existing destination
+    for current, _, files in os.walk(source):
+        target = os.path.join(destination, os.path.relpath(current, source))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            shutil.copy2(os.path.join(current, name), target)
+
+
+def _precompress_tree(path):
+    # writes a .gz and .br file next to each file that compresses well
+    for current, _, files in os.walk(path):
+        for name in files:
+            if name.endswith(('.gz', '.br')):
+                continue
+            file_path = os.path.join(current, name)
+            with open(file_path, 'rb') as f:
+                body = f.read()
+            compressed_file = CompressedFile(body, guess_type(file_path))
+            for encoding, extension in (('gzip', '.gz'), ('br', '.br')):
+                if encoding in compressed_file.variants:
+                    with open(file_path + extension, 'wb') as f:
+                        f.write(compressed_file.variants[encoding])
+
+
+def _freeze_routes(xplorable, output_path):
+    # each route is stored in the same format that xplore.js uses for its
+    # client side cache
+    for route in xplorable.all_routes:
+        page = xplorable._get_page(route)
+        entry = {
+            'body': xplorable._get_encoded_route(route).decode('utf-8'),
+            'prefetch': (xplorable._get_neighbour_routes(page)
+                         if xplorable.prefetch_depth else []),
+        }
+        path = os.path.join(output_path, FROZEN_PATH, 'routes',
+                            f'{route_file_name(route)}.json')
+        _write_json(path, entry)
+
+
+def _find_components(xplorable):
+    # returns a dict of all components with IDs in the deck, keyed by ID
+    components = {}
+    layouts = [xplorable.app.layout]
+    for page in xplorable.page_list:
+        if page.is_family:
+            # a family's callbacks aren't frozen, as the components they use
+            # only exist in its members
+            continue
+        page.materialise()
+        layouts.append(page.layout)
+
+    for layout in layouts:
+        if not isinstance(layout, Component):
+            continue
+        for component in itertools.chain([layout], layout.traverse()):
+            component_id = getattr(component, 'id', None)
+            if component_id is not None:
+                components[component_id] = component
+    return components
+
+
+def _get_domain(component, prop):
+    # returns the list of values a component's property can take, or None if
+    # this isn't a small finite set
+    if component is None:
+        return None
+
+    if prop == 'value' and getattr(component, 'multi', False):
+        return None
+
+    options = getattr(component, 'options', None)
+    if prop == 'value' and options is not None:
+        return [option['value'] for option in options]
+
+    if prop == 'value' and type(component).__name__ == 'Slider':
+        step = getattr(component, 'step', 1)
+        marks = getattr(component, 'marks', None)
+        if step is None:
+            if not marks:
+                return None
+            return [_parse_mark(mark) for mark in marks]
+        start, stop = component.min, component.max
+        if None in (start, stop):
+            return None
+        count = int((stop - start) / step) + 1
+        return [_parse_mark(str(start + i*step)) for i in range(count)]
+
+    return None
+
+
+def _parse_mark(mark):
+    # slider marks are keyed by strings of their numeric values
+    value = float(mark)
+    return int(value) if value.is_integer() else value
+
+
+def _freeze_callbacks(xplorable, output_path, max_combinations):
+    app = xplorable.app
+    components = _find_components(xplorable)
+    router_id = '{}.children'.format(config.PAGE_ELEMENT_ID)
+    report = {'frozen': [], 'skipped': [], 'errors': []}
+
+    for callback_id, callback in app.callback_map.items():
+        if callback_id == router_id:
+            continue
+
+        dependencies = callback['inputs'] + callback['state']
+        domains = [_get_domain(components.get(dep['id']), dep['property'])
+                   for dep in dependencies]
+
+        if callback['events'] or any(domain is None for domain in domains):
+            report['skipped'].append(callback_id)
+            continue
+
+        num_combinations = 1
+        for domain in domains:
+            num_combinations *= len(domain)
+        if num_combinations > max_combinations:
+            report['skipped'].append(callback_id)
+            continue
+
+        # combinations that don't update the output, or that raise an
+        # error, are left out, so the frozen deck doesn't update for them
+        outputs = {}
+        errors = []
+        with app.server.test_request_context():
+            for args in itertools.product(*domains):
+                try:
+                    response = callback['callback'](*args)
+                except PreventUpdate:
+                    continue
+                except Exception as e:
+                    errors.append(f'{type(e).__name__}: {e}')
+                    continue
+                # keys must match those built by fetchFrozenCallback in xplore.js
+                key = json.dumps(list(args), separators=(',', ':'),
+                                 ensure_ascii=False)
+                outputs[key] = json.loads(response.get_data(as_text=True))
+
+        if errors:
+            reason = (f'{len(errors)} of {num_combinations} combinations '
+                      f'failed, first with {errors[0]}')
+            report['errors'].append((callback_id, reason))
+
+        table = {
+            'inputs': [[dep['id'], dep['property']] for dep in dependencies],
+            'outputs': outputs,
+        }
+        path = os.path.join(output_path, FROZEN_PATH, 'callbacks',
+                            f'{callback_id}.json')
+        _write_json(path, table)
+        report['frozen'].append(callback_id)
+
+    return report
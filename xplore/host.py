@@ -0,0 +1,180 @@
+import os
+import time
+import tracemalloc
+from threading import Lock
+from collections import OrderedDict
+from html import escape
+
+from flask import Flask, Response, abort, jsonify
+
+from . import config
+from .exceptions import ValidationException
+from .staticfiles import StaticFiles
+
+
+# URL prefixes under which the host serves its own routes, which decks can't
+# be mounted under
+RESERVED_PREFIXES = ('/static', '/_xplore')
+
+
+class XploreHost:
+    """
+    A WSGI app that serves many Xplorables from one process, each mounted
+    under its own URL prefix, eg
+
+        application = XploreHost({'/sales': SalesDeck, '/ops': OpsDeck})
+
+    Each deck is built the first time its prefix is requested, so decks that
+    aren't visited cost nothing. xplore's own static files, and the bundles
+    of them when bundle_assets is set, are served once by the host at the
+    server root for all decks, so browsers also cache them once.
+
+    The time taken to build each deck and the memory it retains are recorded
+    and served as JSON from config.HOST_REPORT_URL. Memory is measured with
+    tracemalloc while the deck is built, which slows the build down, and
+    includes anything allocated by other threads in the meantime. Set
+    measure_memory to False to skip it.
+    """
+
+    def __init__(self, decks, deck_kwargs=None, precompress_static=False,
+                 measure_memory=True):
+        self.deck_classes = OrderedDict()
+        for prefix, cls in decks.items():
+            self.deck_classes[_check_prefix(prefix)] = cls
+        # nested prefixes are matched longest first
+        self._prefixes = sorted(self.deck_classes, key=len, reverse=True)
+        self.deck_kwargs = deck_kwargs if deck_kwargs is not None else {}
+        self.measure_memory = measure_memory
+
+        self.decks = {}
+        self.stats = {}
+        self.static_files = StaticFiles(os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), config.STATIC_PATH))
+        if precompress_static:
+            self.static_files.precompress()
+        # bundles added by the decks, keyed by name. bundles are named by
+        # the hash of their contents, so decks share identical bundles
+        self.bundle_files = {}
+        self._lock = Lock()
+
+        self.server = Flask(__name__, static_folder=None)
+        self._init_routes()
+
+    def _init_routes(self):
+        server = self.server
+
+        @server.route('/static/xplore/<path:path>')
+        def send_static(path):
+            return self.static_files.send(path)
+
+        @server.route('{}/<name>'.format(config.BUNDLE_URL))
+        def send_bundle(name):
+            bundle_file = self.bundle_files.get(name)
+            if bundle_file is None:
+                abort(404)
+            return bundle_file.make_response(
+                'public, max-age=31536000, immutable')
+
+        @server.route(config.HOST_REPORT_URL)
+        def send_report():
+            return jsonify(self.report())
+
+        @server.route('/')
+        def index():
+            items = ''.join(
+                '<li><a href="{}/">{}</a></li>'.format(
+                    escape(prefix), escape(getattr(cls, 'title', prefix)))
+                for prefix, cls in self.deck_classes.items()
+            )
+            return Response(f'<!DOCTYPE html><ul>{items}</ul>',
+                            mimetype='text/html')
+
+    def get_deck(self, prefix):
+        """Returns the deck mounted under prefix, building it if needed"""
+        deck = self.decks.get(prefix)
+        if deck is not None:
+            return deck
+
+        # decks are built one at a time, which keeps the memory measured
+        # for each to its own
+        with self._lock:
+            deck = self.decks.get(prefix)
+            if deck is None:
+                deck = self._build(prefix)
+                self.decks[prefix] = deck
+        return deck
+
+    def _build(self, prefix):
+        cls = self.deck_classes[prefix]
+        tracing = self.measure_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0] if self.measure_memory else 0
+
+        start = time.perf_counter()
+        try:
+            deck = cls(url_prefix=prefix, host=self, **self.deck_kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.measure_memory:
+                current, peak = tracemalloc.get_traced_memory()
+            if tracing:
+                tracemalloc.stop()
+
+        self.stats[prefix] = {
+            'build_seconds': elapsed,
+            'memory_bytes': current - before if self.measure_memory else None,
+            # the peak only covers the build when tracing started with it
+            'peak_memory_bytes': peak if tracing else None,
+        }
+        return deck
+
+    def report(self):
+        """Returns a dict describing each deck, keyed by prefix"""
+        report = OrderedDict()
+        for prefix, cls in self.deck_classes.items():
+            entry = {
+                'class': f'{cls.__module__}.{cls.__qualname__}',
+                'loaded': prefix in self.decks,
+                'pages': None,
+                'build_seconds': None,
+                'memory_bytes': None,
+                'peak_memory_bytes': None,
+            }
+            if prefix in self.decks:
+                entry['pages'] = len(self.decks[prefix].page_list)
+                entry.update(self.stats[prefix])
+            report[prefix] = entry
+        return report
+
+    def _match(self, path):
+        # returns the prefix of the deck that path belongs to, if any
+        for prefix in self._prefixes:
+            if path == prefix or path.startswith(prefix + '/'):
+                return prefix
+        return None
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '') or '/'
+        prefix = self._match(path)
+        if prefix is None:
+            return self.server(environ, start_response)
+
+        # the deck sees the request relative to its prefix, as if it were
+        # mounted at that path by the WSGI server
+        deck = self.get_deck(prefix)
+        environ = dict(environ)
+        environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + prefix
+        environ['PATH_INFO'] = path[len(prefix):] or '/'
+        return deck(environ, start_response)
+
+
+def _check_prefix(url_prefix):
+    prefix = url_prefix.rstrip('/')
+    if not prefix.startswith('/'):
+        msg = f"deck prefix '{url_prefix}' must start with '/' and not be the root"
+        raise ValidationException(msg)
+    if any(prefix == reserved or prefix.startswith(reserved + '/')
+           for reserved in RESERVED_PREFIXES):
+        raise ValidationException(f"deck prefix '{url_prefix}' is reserved")
+    return prefix
@@ -0,0 +1,182 @@
+import os
+import io
+from threading import Lock
+
+from flask import request, abort
+
+try:
+    from werkzeug.utils import safe_join
+except ImportError:
+    # older versions of werkzeug
+    from werkzeug.security import safe_join
+
+try:
+    from PIL import Image as PILImage, features
+except ImportError:
+    # resized variants need Pillow. without it, originals are served
+    PILImage = None
+
+from . import config
+from .staticfiles import StaticFiles
+
+
+# raster formats that variants are generated for. other images, such as
+# SVGs, are served as they are
+RESIZABLE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+
+# the formats variants are saved in, and the options they're saved with
+SAVE_OPTIONS = {
+    'PNG': {'optimize': True},
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 6},
+}
+
+
+def is_resizable(src):
+    return (isinstance(src, str) and
+            os.path.splitext(src)[1].lower() in RESIZABLE_EXTENSIONS)
+
+
+def variant_url(src, width):
+    """
+    Returns the URL of the variant of an image in the static folder, at
+    most width pixels wide
+    """
+    return '{}/{}/{}'.format(config.IMAGE_URL, width, src)
+
+
+def webp_supported():
+    return PILImage is not None and features.check('webp')
+
+
+class ImageVariants:
+    """
+    Generates resized variants of the raster images in a static folder,
+    caching them on disk, and serves them in WebP to clients that accept it.
+
+    Variants are never wider than the original image, which is served in
+    place of any variant that would be.
+    """
+
+    def __init__(self, static_folder, cache_path):
+        self.static_folder = static_folder
+        self.cache_path = cache_path
+        self.originals = StaticFiles(static_folder)
+        self.variants = StaticFiles(cache_path)
+        self._lock = Lock()
+        # (src, width, webp) -> (mtime of src, variant path or None), so
+        # that originals aren't reopened to decide the same thing again
+        self._decisions = {}
+
+    def send(self, width, src):
+        """Returns a response for the variant of src at most width wide"""
+        if width not in config.IMAGE_WIDTHS:
+            abort(404)
+
+        source_path = safe_join(self.static_folder, src)
+        if source_path is None or not os.path.isfile(source_path):
+            abort(404)
+        if not is_resizable(src) or not self.can_resize:
+            return self.originals.send(src)
+
+        use_webp = ('image/webp' in request.headers.get('Accept', '') and
+                    webp_supported())
+        variant_path = self.get_variant(src, width, use_webp)
+        if variant_path is None:
+            response = self.originals.send(src)
+        else:
+            response = self.variants.get(variant_path).make_response(
+                self.variants.cache_control)
+        response.headers['Vary'] = 'Accept'
+        return response
+
+    @property
+    def can_resize(self):
+        return PILImage is not None
+
+    def get_variant(self, src, width, webp=False):
+        """
+        Returns the path to the cached variant of src, generating it if
+        needed, or None if the original is no wider than width.
+        """
+        source_path = os.path.join(self.static_folder, src)
+        extension = '.webp' if webp else os.path.splitext(src)[1].lower()
+        variant_path = os.path.join(self.cache_path, src, f'{width}{extension}')
+
+        source_mtime = os.stat(source_path).st_mtime
+        key = (src, width, webp)
+        decision = self._decide(key, source_mtime)
+        if decision is not False:
+            return decision
+        if os.path.isfile(variant_path) and \
+                os.stat(variant_path).st_mtime >= source_mtime:
+            self._decisions[key] = (source_mtime, variant_path)
+            return variant_path
+
+        with self._lock:
+            # another thread may have decided while this one waited
+            decision = self._decide(key, source_mtime)
+            if decision is not False:
+                return decision
+
+            with PILImage.open(source_path) as image:
+                if image.width <= width and not webp:
+                    self._decisions[key] = (source_mtime, None)
+                    return None
+                image.load()
+                variant = _resize(image, width)
+
+            fmt = 'WEBP' if webp else ('PNG' if extension == '.png' else 'JPEG')
+            if fmt == 'JPEG' and variant.mode not in ('RGB', 'L'):
+                variant = variant.convert('RGB')
+
+            buffer = io.BytesIO()
+            variant.save(buffer, fmt, **SAVE_OPTIONS[fmt])
+
+            # write then rename so that a partial file is never served
+            os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+            tmp_path = f'{variant_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp_path, variant_path)
+            self._decisions[key] = (source_mtime, variant_path)
+        return variant_path
+
+    def _decide(self, key, source_mtime):
+        # returns the remembered variant path or None for the current
+        # version of the original, or False if there isn't one. variants
+        # deleted from the cache since are regenerated
+        mtime, variant_path = self._decisions.get(key, (None, None))
+        if mtime != source_mtime:
+            return False
+        if variant_path is not None and not os.path.isfile(variant_path):
+            return False
+        return variant_path
+
+    def generate(self, widths=None):
+        """
+        Generates every variant of every image in the static folder,
+        yielding the path of each image as it's done
+        """
+        widths = config.IMAGE_WIDTHS if widths is None else widths
+        for current, _, files in os.walk(self.static_folder):
+            for name in sorted(files):
+                src = os.path.relpath(os.path.join(current, name),
+                                      self.static_folder)
+                if not is_resizable(src):
+                    continue
+                for width in widths:
+                    self.get_variant(src, width)
+                    if webp_supported():
+                        self.get_variant(src, width, webp=True)
+                yield src
+
+
+def _resize(image, width):
+    if image.width <= width:
+        return image.copy()
+    height = round(image.height * width / image.width)
+    if image.mode == 'P':
+        # palette images resize badly
+        image = image.convert('RGBA')
+    return image.resize((width, height), PILImage.LANCZOS)
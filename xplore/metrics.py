@@ -0,0 +1,148 @@
+import time
+from bisect import bisect_left
+from functools import wraps
+from threading import Lock
+from collections import OrderedDict
+
+from dash.exceptions import PreventUpdate
+
+
+# upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# label given to router requests for routes that don't exist, so that
+# arbitrary URLs can't create an unbounded number of series
+UNKNOWN_ROUTE = '<unknown>'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metrics:
+    """
+    Collects the latency, request count, error count and response size of
+    the callbacks of an Xplorable, and renders them in the Prometheus text
+    exposition format.
+
+    Router requests are labelled by the route of the page requested and all
+    other callbacks by their output, eg 'indicator-graphic.figure'.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self._series = OrderedDict()
+        self._lock = Lock()
+
+    def wrap_callback(self, callback, output_id, get_route=None):
+        """
+        Wraps a Dash callback, as found in app.callback_map, so that each call
+        is recorded. get_route, if given, maps the callback's arguments onto
+        the route label of the request, marking it as a router request.
+        """
+        @wraps(callback)
+        def measured_callback(*args):
+            if get_route is None:
+                labels = (('output', output_id),)
+            else:
+                labels = (('route', get_route(*args)),)
+
+            start = time.perf_counter()
+            error = False
+            size = 0
+            try:
+                response = callback(*args)
+                size = len(response.get_data())
+                return response
+            except PreventUpdate:
+                raise
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.observe(labels, time.perf_counter() - start, size, error)
+
+        return measured_callback
+
+    def observe(self, labels, seconds, size, error=False):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = _Series(len(self.buckets))
+            series.count += 1
+            series.seconds += seconds
+            series.bytes += size
+            series.buckets[bisect_left(self.buckets, seconds)] += 1
+            if error:
+                series.errors += 1
+
+    def render(self):
+        """Returns the metrics in the Prometheus text exposition format"""
+        with self._lock:
+            series = [(labels, s.copy()) for labels, s in self._series.items()]
+
+        lines = []
+        for kind, label in (('router', 'route'), ('callback', 'output')):
+            matching = [(dict(labels)[label], s) for labels, s in series
+                        if labels[0][0] == label]
+            name = f'xplore_{kind}'
+            lines += [
+                f'# HELP {name}_duration_seconds Time taken to handle {kind} requests.',
+                f'# TYPE {name}_duration_seconds histogram',
+            ]
+            for value, s in matching:
+                cumulative = 0
+                for bound, count in zip(self.buckets + ['+Inf'], s.buckets):
+                    cumulative += count
+                    lines.append(_line(f'{name}_duration_seconds_bucket',
+                                       {label: value, 'le': bound}, cumulative))
+                lines.append(_line(f'{name}_duration_seconds_sum',
+                                   {label: value}, s.seconds))
+                lines.append(_line(f'{name}_duration_seconds_count',
+                                   {label: value}, s.count))
+
+            for suffix, attr, help_text in (
+                    ('requests_total', 'count', 'Number of {} requests.'),
+                    ('errors_total', 'errors', 'Number of {} requests that raised an error.'),
+                    ('response_bytes_total', 'bytes', 'Total size of {} responses in bytes.')):
+                lines += [
+                    f'# HELP {name}_{suffix} {help_text.format(kind)}',
+                    f'# TYPE {name}_{suffix} counter',
+                ]
+                for value, s in matching:
+                    lines.append(_line(f'{name}_{suffix}', {label: value},
+                                       getattr(s, attr)))
+
+        return '\n'.join(lines) + '\n'
+
+
+class _Series:
+
+    def __init__(self, num_buckets):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        # one count per bucket, plus one for +Inf
+        self.buckets = [0] * (num_buckets + 1)
+
+    def copy(self):
+        series = _Series(0)
+        series.__dict__.update(self.__dict__, buckets=list(self.buckets))
+        return series
+
+
+def _line(name, labels, value):
+    label_str = ','.join(
+        '{}="{}"'.format(key, _escape(_format_value(label_value)))
+        for key, label_value in labels.items()
+    )
+    return f'{name}{{{label_str}}} {_format_value(value)}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,105 @@
+from threading import Lock
+from collections import OrderedDict
+
+import numpy as np
+
+from .exceptions import ValidationException
+
+
+class PagedFrame:
+    """
+    A DataFrame kept on the server and served a page at a time, after being
+    filtered and sorted, so that only the rows on show are ever sent to the
+    browser.
+
+    Filtering keeps the rows where any of the columns contains the filter
+    text, ignoring case. The row positions matching each combination of
+    filter and sort are kept for the max_queries most recently used, so
+    paging through a result doesn't repeat the work.
+    """
+
+    max_queries = 32
+
+    def __init__(self, frame, page_size=20, columns=None):
+        if page_size < 1:
+            raise ValidationException("'page_size' param must be at least 1")
+        if columns is not None:
+            missing = [column for column in columns if column not in frame.columns]
+            if missing:
+                msg = "columns not in the frame: {}".format(
+                    ', '.join(map(str, missing)))
+                raise ValidationException(msg)
+            frame = frame[list(columns)]
+        self.frame = frame
+        self.page_size = page_size
+
+        self._text = None
+        self._queries = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def page_count(self, row_count):
+        return max(1, -(-row_count // self.page_size))
+
+    def get_page(self, page=1, filter_text=None, sort_by=None, ascending=True):
+        """
+        Returns the rows on the page, counting from 1, of the filtered and
+        sorted frame as a DataFrame, along with the number of rows matching
+        the filter and the page actually returned, as pages beyond the last
+        return the last.
+        """
+        positions = self.positions(filter_text, sort_by, ascending)
+        page_count = self.page_count(len(positions))
+        try:
+            page = min(max(int(page), 1), page_count)
+        except (TypeError, ValueError):
+            page = 1
+        start = (page - 1) * self.page_size
+        rows = self.frame.iloc[positions[start:start + self.page_size]]
+        return rows, len(positions), page
+
+    def positions(self, filter_text=None, sort_by=None, ascending=True):
+        """Returns the positions of the filtered rows, in sorted order"""
+        filter_text = (filter_text or '').strip().lower()
+        if sort_by not in self.frame.columns:
+            sort_by = None
+        key = (filter_text, sort_by, bool(ascending))
+
+        with self._lock:
+            positions = self._queries.get(key)
+            if positions is not None:
+                self._queries.move_to_end(key)
+                return positions
+
+        positions = np.arange(len(self.frame))
+        if filter_text:
+            positions = positions[self._matches(filter_text)]
+        if sort_by is not None:
+            values = self.frame[sort_by].iloc[positions]
+            # a stable sort, with missing values last either way
+            order = values.reset_index(drop=True).sort_values(
+                ascending=ascending, kind='stable', na_position='last').index
+            positions = positions[order.to_numpy()]
+
+        with self._lock:
+            self._queries[key] = positions
+            self._queries.move_to_end(key)
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+        return positions
+
+    def _matches(self, filter_text):
+        # the lower case text of every cell is built on the first filter,
+        # rather than for every frame whether or not it's filtered
+        if self._text is None:
+            self._text = [
+                self.frame[column].astype(str).str.lower().reset_index(drop=True)
+                for column in self.frame.columns
+            ]
+        mask = np.zeros(len(self.frame), dtype=bool)
+        for text in self._text:
+            mask |= text.str.contains(filter_text, regex=False).to_numpy()
+        return mask
@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from .exceptions import ValidationException
+
+
+# the ways an Xplorable's pages can be built concurrently. threads suit
+# get_data methods that wait on I/O, processes those that parse in Python
+CONCURRENCY_MODES = ('thread', 'process')
+
+
+def check_concurrency(concurrency):
+    if concurrency is not None and concurrency not in CONCURRENCY_MODES:
+        msg = "'concurrency' param must be None, {}".format(
+            ' or '.join(f"'{mode}'" for mode in CONCURRENCY_MODES))
+        raise ValidationException(msg)
+
+
+def materialise_pages(pages, concurrency, max_workers=None, profile=None):
+    """
+    Materialises unmaterialised pages concurrently, returning once they are
+    all built. Any exception raised while building a page is raised here.
+
+    With 'thread' concurrency each page's data is loaded and layout built on
+    a thread pool. With 'process' concurrency each page's get_data is run in
+    a worker process, in a fresh instance of its class, and the attributes
+    it sets are copied back onto the page, whose layout is then built in
+    this process. Block classes must then be importable by the workers, ie
+    defined at the top level of a module, and the attributes picklable.
+    """
+    pages = [page for page in pages
+             if not page.is_materialised and not page.is_family]
+    if concurrency == 'thread':
+        with ThreadPoolExecutor(max_workers) as executor:
+            # consume the results so that exceptions are raised
+            list(executor.map(lambda page: page.materialise(), pages))
+        return
+
+    data_pages = [page for page in pages if hasattr(page, 'get_data')]
+    if data_pages:
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(_load_data, *_get_spec(page))
+                       for page in data_pages]
+            for page, future in zip(data_pages, futures):
+                elapsed, attrs = future.result()
+                if profile is not None:
+                    profile.record('get_data', elapsed, page=page)
+                if attrs is not None:
+                    page.__dict__.update(attrs)
+                    page._data_loaded = True
+
+    for page in pages:
+        page.materialise()
+
+
+def _get_spec(page):
+    # the arguments needed to recreate a page in another process
+    return (type(page), page.index, page.project_path, page.name, page.url,
+            page.data_cache, page.data_store)
+
+
+def _load_data(cls, index, project_path, name, url, data_cache, data_store):
+    # runs in a worker process. returns the time taken, along with the
+    # attributes set by get_data, or None where the data is left in the
+    # data cache or store instead, which is then quick to load from there
+    block = cls(None, index, project_path, name=name, url=url, lazy=True,
+                data_cache=data_cache, data_store=data_store)
+    before = dict(block.__dict__)
+
+    start = time.perf_counter()
+    block._load_data()
+    elapsed = time.perf_counter() - start
+
+    if block._uses_data_cache or block._uses_data_store:
+        return elapsed, None
+    return elapsed, {
+        key: value for key, value in block.__dict__.items()
+        if key not in before or before[key] is not value
+    }
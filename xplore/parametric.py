@@ -0,0 +1,273 @@
+import re
+from threading import Lock
+from collections import OrderedDict
+from urllib.parse import quote, unquote
+
+from .block import Block
+from .utils import camel_case_to_title
+from .exceptions import ValidationException
+
+
+URL_PARAM_RE = re.compile(r'<(\w+)>')
+
+
+def compile_url_pattern(url_pattern):
+    # a regex matching the routes of a url_pattern, capturing each parameter
+    parts = URL_PARAM_RE.split(url_pattern)
+    regex = ''.join(re.escape(part) if i % 2 == 0 else f'(?P<{part}>[^/]+)'
+                    for i, part in enumerate(parts))
+    return re.compile(f'^{regex}$')
+
+
+class ParametricBlock(Block):
+    """
+    A family of Blocks generated from a list of parameters, such as one page
+    per country, eg
+
+        class Country(ParametricBlock):
+            url_pattern = '/country/<code>'
+
+            def get_params(self):
+                return ['AU', 'NZ', 'PG']
+
+            @property
+            def content(self):
+                return html.H1(self.params['code'])
+
+    A ParametricBlock listed in an Xplorable's pages stands in for the whole
+    family. get_params is called once, on this prototype, and returns the
+    family's parameters in page order, each either a dict keyed by the names
+    in url_pattern or, for patterns with a single name, just the value.
+
+    Members of the family are created when their route is first requested,
+    with their parameters in self.params, and only the max_members most
+    recently used are kept. Their prev and next pages follow the order of the
+    parameters. Callbacks are registered once, on the prototype, so callbacks
+    that depend on the member being shown should look it up with get_member,
+    eg from the url pathname passed as State.
+    """
+
+    url_pattern = None
+    max_members = 128
+
+    def __init__(self, app, index, project_path, name=None, url=None,
+                 params=None, family=None, **kwargs):
+        self.params = params
+        self.family = family
+
+        if params is None:
+            # this is the prototype, which holds the family's members
+            if self.url_pattern is None:
+                msg = f"'{type(self).__name__}' must set 'url_pattern'"
+                raise ValidationException(msg)
+            self._param_names = URL_PARAM_RE.findall(self.url_pattern)
+            self._route_re = compile_url_pattern(self.url_pattern)
+            # members are built on request, so aren't profiled, and have
+            # no callbacks of their own
+            self._member_kwargs = dict(kwargs, project_path=project_path,
+                                       lazy=True, profile=None)
+            self._member_kwargs.pop('defer_callbacks', None)
+            self._members = OrderedDict()
+            self._members_lock = Lock()
+            # the prototype itself is never materialised
+            kwargs['lazy'] = True
+
+        super().__init__(app, index, project_path, name=name, url=url, **kwargs)
+
+        if params is None:
+            self._keys = [self._get_key(item) for item in self.get_params()]
+            self._positions = {key: i for i, key in enumerate(self._keys)}
+            if not self._keys:
+                msg = f"'{type(self).__name__}' has no parameters"
+                raise ValidationException(msg)
+
+    def get_params(self):
+        msg = f"'{type(self).__name__}' must define 'get_params'"
+        raise ValidationException(msg)
+
+    @property
+    def is_family(self):
+        return self.params is None
+
+    @property
+    def refreshes(self):
+        # members are reloaded when they're rebuilt, rather than refreshed
+        return False
+
+    def materialise(self):
+        if not self.is_family:
+            super().materialise()
+
+    def get_member(self, pathname):
+        """
+        Returns the member of the family with the route, built and ready to
+        use, or None if no member has the route
+        """
+        position = self._get_position(pathname)
+        if position is None:
+            return None
+        member = self._get_member_at(position)
+        member.materialise()
+        return member
+
+    def has_member(self, pathname):
+        """Returns whether a member has the route, without building it"""
+        return self._get_position(pathname) is not None
+
+    def _get_position(self, pathname):
+        match = self._route_re.match(pathname) if isinstance(pathname, str) else None
+        if match is None:
+            return None
+        key = tuple(unquote(match.group(name)) for name in self._param_names)
+        return self._positions.get(key)
+
+    def _get_member_at(self, position):
+        key = self._keys[position]
+        with self._members_lock:
+            member = self._members.get(key)
+            if member is not None:
+                self._members.move_to_end(key)
+                return member
+
+        member = type(self)(
+            None,
+            self.index,
+            params=dict(zip(self._param_names, key)),
+            family=self,
+            url=self._get_url(key),
+            **self._member_kwargs
+        )
+        # members are built after the deck, so are already final
+        member._finalised = True
+
+        with self._members_lock:
+            # another thread may have created the member in the meantime
+            member = self._members.setdefault(key, member)
+            self._members.move_to_end(key)
+            while len(self._members) > self.max_members:
+                self._members.popitem(last=False)
+        return member
+
+    def _get_key(self, item):
+        if not isinstance(item, dict):
+            if len(self._param_names) != 1:
+                msg = "parameters must be dicts for 'url_pattern' with several names"
+                raise ValidationException(msg)
+            item = {self._param_names[0]: item}
+        return tuple(str(item[name]) for name in self._param_names)
+
+    def _get_url(self, key):
+        values = dict(zip(self._param_names, key))
+        return URL_PARAM_RE.sub(lambda m: quote(values[m.group(1)], safe=''),
+                                self.url_pattern)
+
+    @property
+    def routes(self):
+        """The routes of every member of the family, in page order"""
+        return [self._get_url(key) for key in self._keys]
+
+    # links to members are only stand-ins for them, as only requests for a
+    # member should build it or count as using it
+
+    @property
+    def first_page(self):
+        return _MemberLink(self, 0) if self.is_family else self
+
+    @property
+    def last_page(self):
+        return _MemberLink(self, len(self._keys) - 1) if self.is_family else self
+
+    @property
+    def prev_page(self):
+        if self.is_family:
+            return self._prev_page
+        return _MemberLink(self.family, self.family._positions[self._key]).prev_page
+
+    @prev_page.setter
+    def prev_page(self, page):
+        self._prev_page = page
+
+    @property
+    def next_page(self):
+        if self.is_family:
+            return self._next_page
+        return _MemberLink(self.family, self.family._positions[self._key]).next_page
+
+    @next_page.setter
+    def next_page(self, page):
+        self._next_page = page
+
+    @property
+    def _key(self):
+        return tuple(self.params[name] for name in self.family._param_names)
+
+    @property
+    def url(self):
+        if self.is_family:
+            return self._get_url(self._keys[0])
+        return super().url
+
+    @url.setter
+    def url(self, url):
+        self._url = url
+
+    @property
+    def name(self):
+        if not hasattr(self, '_name'):
+            name = camel_case_to_title(type(self).__name__)
+            if not self.is_family:
+                name = '{} {}'.format(name, ' '.join(self._key))
+            self._name = name
+        return self._name
+
+    @property
+    def _block_key(self):
+        # members cache and share their data separately. each value is
+        # escaped, including the ',' between them, so that different members
+        # never share a key
+        key = super()._block_key
+        if self.is_family:
+            return key
+        return '{}.{}'.format(key, ','.join(quote(value, safe='')
+                                            for value in self._key))
+
+
+class _MemberLink:
+    """
+    Stands in for the member of a family at a position where only its URL
+    is needed, such as in the links between pages, without building it
+    """
+
+    is_family = False
+
+    def __init__(self, family, position):
+        self.family = family
+        self.position = position
+
+    @property
+    def url(self):
+        return self.family._get_url(self.family._keys[self.position])
+
+    @property
+    def href(self):
+        return f'{self.family.url_prefix}{self.url}'
+
+    @property
+    def first_page(self):
+        return self
+
+    @property
+    def last_page(self):
+        return self
+
+    @property
+    def prev_page(self):
+        if self.position == 0:
+            return self.family._prev_page
+        return _MemberLink(self.family, self.position - 1)
+
+    @property
+    def next_page(self):
+        if self.position == len(self.family._keys) - 1:
+            return self.family._next_page
+        return _MemberLink(self.family, self.position + 1)
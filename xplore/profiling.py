@@ -0,0 +1,131 @@
+import json
+import time
+from threading import Lock
+from contextlib import contextmanager
+from collections import OrderedDict
+
+from dash.development.base_component import Component
+
+
+# the order in which phases are reported. _make_container runs within
+# _get_layout, so its time is also included in that of _get_layout
+PAGE_PHASES = [
+    'get_data',
+    '_get_layout',
+    '_make_container',
+    '_add_classes',
+    '_add_styles',
+    '_init_callbacks',
+    'finalise',
+    'encode',
+]
+
+DECK_PHASES = [
+    '_init_pages',
+    '_init_app',
+    'precompress_static',
+    'asset_registration',
+    '_register_routes',
+    'finalise',
+    'encode',
+]
+
+
+class StartupProfile:
+    """
+    Records how long each phase of building an Xplorable takes, both for the
+    deck as a whole and for each page, along with the number of components
+    in each page's layout. Pages may be timed from several threads at once.
+    """
+
+    def __init__(self):
+        self.deck = OrderedDict()
+        self.pages = OrderedDict()
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, name, page=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, page=page)
+
+    def record(self, name, seconds, page=None):
+        with self._lock:
+            timings = self.deck if page is None else self._get_page(page)['phases']
+            timings[name] = timings.get(name, 0) + seconds
+
+    def set_node_count(self, page, layout):
+        nodes = count_components(layout)
+        with self._lock:
+            self._get_page(page)['nodes'] = nodes
+
+    def _get_page(self, page):
+        key = (page.index, page.name)
+        if key not in self.pages:
+            self.pages[key] = {
+                'index': page.index,
+                'name': page.name,
+                'class': type(page).__name__,
+                'phases': {},
+                'nodes': None,
+            }
+        return self.pages[key]
+
+    def to_dict(self):
+        pages = []
+        # pages built concurrently are seen in no particular order
+        for page in sorted(self.pages.values(), key=lambda p: p['index']):
+            # _make_container is already counted within _get_layout
+            total = sum(seconds for phase, seconds in page['phases'].items()
+                        if phase != '_make_container')
+            pages.append(dict(page, total=total))
+        return {'deck': dict(self.deck), 'pages': pages}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def table(self):
+        """Returns the profile as a text table with times in milliseconds"""
+        profile = self.to_dict()
+        headers = ['#', 'page'] + PAGE_PHASES + ['total', 'nodes']
+        rows = []
+        for page in sorted(profile['pages'], key=lambda p: -p['total']):
+            row = [str(page['index']), page['name']]
+            row += [_format_ms(page['phases'].get(phase)) for phase in PAGE_PHASES]
+            row += [_format_ms(page['total']), str(page['nodes'] or '')]
+            rows.append(row)
+
+        widths = [max(len(row[i]) for row in [headers] + rows)
+                  for i in range(len(headers))]
+        lines = [
+            '  '.join(cell.ljust(width) if i < 2 else cell.rjust(width)
+                      for i, (cell, width) in enumerate(zip(row, widths)))
+            for row in [headers] + rows
+        ]
+        lines.insert(1, '-' * len(lines[0]))
+
+        lines.append('')
+        for phase in DECK_PHASES:
+            if phase in profile['deck']:
+                lines.append(f"{phase}: {_format_ms(profile['deck'][phase])} ms")
+        return '\n'.join(lines)
+
+
+def count_components(layout):
+    """Returns the number of components in a layout tree"""
+    count = 0
+    stack = [layout]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Component):
+            count += 1
+            stack.append(getattr(node, 'children', None))
+        elif isinstance(node, (list, tuple)):
+            stack.extend(node)
+    return count
+
+
+def _format_ms(seconds):
+    return '' if seconds is None else f'{seconds*1000:.1f}'
@@ -0,0 +1,123 @@
+import os
+import copy
+import time
+import logging
+from threading import Thread, Event, Lock
+
+from . import config
+
+
+logger = logging.getLogger(__name__)
+
+
+class DataRefresher:
+    """
+    Reloads the data of Blocks with a refresh policy in a background thread,
+    either every refresh_interval seconds or when one of their data_sources
+    changes on disk.
+
+    Data is reloaded into a shallow copy of the Block, so the Block itself
+    keeps serving its current data while the reload runs. The attributes
+    set by get_data are then swapped onto the Block all at once. get_data
+    must therefore assign new objects rather than change the existing ones
+    in place. If a reload fails, the Block keeps its current data.
+
+    Elements that hold data of their own for their callbacks, such as
+    PagedTables and DownsampledGraphs, are rebuilt from the reloaded data
+    and swapped along with it.
+
+    The thread is started on the first request handled by each process, as
+    threads don't survive the fork of a preloading server such as gunicorn.
+    """
+
+    def __init__(self, blocks, poll_interval=None):
+        self.blocks = [block for block in blocks if block.refreshes]
+        self.poll_interval = (config.REFRESH_POLL_INTERVAL
+                              if poll_interval is None else poll_interval)
+        self._due = {}
+        self._stamps = {}
+        self._pid = None
+        self._stop = Event()
+        self._lock = Lock()
+
+        now = time.monotonic()
+        for block in self.blocks:
+            if block.refresh_interval is not None:
+                self._due[block] = now + block.refresh_interval
+            if block.refresh_on_change:
+                self._stamps[block] = _get_stamps(block)
+
+    def ensure_started(self):
+        """Starts the refresh thread in this process if it isn't running"""
+        if not self.blocks or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            thread = Thread(target=self._run, name='xplore-refresh', daemon=True)
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh(self, block):
+        """
+        Reloads the block's data, returning whether it was reloaded. Blocks
+        that haven't been materialised have no data to refresh yet.
+        """
+        if not block.is_materialised:
+            return False
+
+        snapshot = copy.copy(block)
+        before = dict(snapshot.__dict__)
+        try:
+            snapshot._reload_data()
+        except Exception:
+            logger.exception('Failed to refresh the data of %s', block._block_key)
+            return False
+
+        changes = {
+            key: value for key, value in snapshot.__dict__.items()
+            if key not in before or before[key] is not value
+        }
+        block._swap_data(changes)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self._next_wait()):
+            now = time.monotonic()
+            for block in self.blocks:
+                if self._is_due(block, now):
+                    self.refresh(block)
+                    if block in self._due:
+                        self._due[block] = time.monotonic() + block.refresh_interval
+
+    def _is_due(self, block, now):
+        due = block in self._due and self._due[block] <= now
+        if block in self._stamps:
+            stamps = _get_stamps(block)
+            if stamps != self._stamps[block]:
+                self._stamps[block] = stamps
+                due = True
+        return due
+
+    def _next_wait(self):
+        # wake for the next interval refresh, or to poll for changed files
+        now = time.monotonic()
+        waits = [due - now for due in self._due.values()]
+        if self._stamps:
+            waits.append(self.poll_interval)
+        return max(0, min(waits))
+
+
+def _get_stamps(block):
+    stamps = {}
+    for path in block._get_data_sources():
+        try:
+            stat = os.stat(path)
+            stamps[path] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            stamps[path] = None
+    return stamps
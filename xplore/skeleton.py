@@ -0,0 +1,109 @@
+from threading import Lock
+
+from dash.development.base_component import Component
+
+from .utils import (LayoutIndex, get_layout_index, set_layout_index,
+                    copy_component)
+
+
+class Skeleton:
+    """
+    A layout tree whose placeholder elements are recorded in a LayoutIndex,
+    from which per-page copies can be made cheaply.
+
+    Only the spine of the tree, ie the root and the components on the paths
+    from it down to the parents of the placeholders, is copied. Everything else,
+    including the placeholders themselves, is shared between the copies, so
+    it must be replaced rather than changed in place, and is marked as shared
+    in the index of each copy, which points at the copied parents.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.index = get_layout_index(root)
+        if self.index is None:
+            self.index = LayoutIndex()
+        self._spine = self._find_spine()
+
+    def _find_spine(self):
+        # ids of the components that have an indexed parent in their subtree
+        parents = {id(parent) for _, (parent, _) in self.index.items()}
+        spine = set()
+
+        def visit(node):
+            on_spine = id(node) in parents
+            children = getattr(node, 'children', None)
+            if isinstance(children, Component):
+                children = [children]
+            if isinstance(children, list):
+                for child in children:
+                    if isinstance(child, Component) and visit(child):
+                        on_spine = True
+            if on_spine:
+                spine.add(id(node))
+            return on_spine
+
+        visit(self.root)
+        # the root is always copied, so that each copy can be given its own
+        # props and index
+        spine.add(id(self.root))
+        return spine
+
+    def instantiate(self):
+        """Returns a copy of the skeleton sharing everything off the spine"""
+        copies = {}
+        index = LayoutIndex()
+        root = self._copy(self.root, copies, index)
+
+        for id_name, (parent, position) in self.index.items():
+            index.add(id_name, copies[id(parent)], position)
+        set_layout_index(root, index)
+        return root
+
+    def _copy(self, node, copies, index):
+        if id(node) not in self._spine:
+            # childless components, such as the placeholders, have nothing
+            # that could be changed by replacing an element
+            if getattr(node, 'children', None) is not None:
+                index.share(node)
+            return node
+
+        clone = copy_component(node)
+        if isinstance(node.__dict__.get('style'), dict):
+            clone.style = dict(node.style)
+
+        children = node.__dict__.get('children')
+        if isinstance(children, Component):
+            clone.children = self._copy(children, copies, index)
+        elif isinstance(children, list):
+            clone.children = [self._copy(child, copies, index)
+                              for child in children]
+
+        copies[id(node)] = clone
+        return clone
+
+
+_skeletons = {}
+_skeletons_lock = Lock()
+
+
+def get_skeleton(key, build):
+    """
+    Returns the Skeleton for key, calling build to create its layout if it
+    hasn't been seen before. Keys that can't be hashed are never memoized.
+    """
+    try:
+        skeleton = _skeletons.get(key)
+    except TypeError:
+        return Skeleton(build())
+
+    if skeleton is None:
+        skeleton = Skeleton(build())
+        with _skeletons_lock:
+            skeleton = _skeletons.setdefault(key, skeleton)
+    return skeleton
+
+
+def clear_skeletons():
+    with _skeletons_lock:
+        _skeletons.clear()
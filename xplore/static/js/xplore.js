@@ -0,0 +1,542 @@
+// Client side support for xplore.
+//
+// Dash asks the server for the layout of each page by POSTing the current
+// pathname to the router callback. This wraps window.fetch so that router
+// responses are cached in the browser, keyed by pathname and the layout
+// version of the deck, so that revisited pages don't need the server. The
+// neighbouring pages of each page that is displayed, along with the images
+// they use, are then prefetched in the background.
+//
+// Frozen decks (see xplore/freeze.py) have no server, so requests are
+// instead redirected to the pre-rendered files written alongside the deck.
+//
+// Images created by components.Image are given a placeholder src, with the
+// real src and srcset in data attributes, and are loaded once they near the
+// viewport.
+//
+// Callback responses from Blocks with a figure_encoding carry numeric
+// arrays as base64 packed typed arrays (see xplore/encoding.py), which are
+// decoded into typed arrays before Dash hands them to plotly.js.
+
+(function() {
+
+    if (!window.fetch) {
+        return;
+    }
+
+    var nativeFetch = window.fetch.bind(window);
+    var CACHE_PREFIX = 'xplore:';
+    var config = null;
+    var memoryCache = {};
+    var prefetched = {};
+    var prefetchedBytes = 0;
+    var callbackTables = {};
+
+    function getConfig() {
+        // the config is embedded in the index page by Xplorable
+        if (config === null) {
+            var element = document.getElementById('_xplore-config');
+            config = element ? JSON.parse(element.textContent) : {};
+            if (config.client_cache) {
+                purgeStaleEntries();
+            }
+        }
+        return config;
+    }
+
+    function getStorage() {
+        try {
+            return window.localStorage;
+        } catch (e) {
+            // storage can be disabled by the browser
+            return null;
+        }
+    }
+
+    function purgeStaleEntries() {
+        // remove pages cached by previous deploys of the deck
+        var storage = getStorage();
+        if (storage === null) {
+            return;
+        }
+        var current = CACHE_PREFIX + config.version + ':';
+        for (var i = storage.length - 1; i >= 0; i--) {
+            var key = storage.key(i);
+            if (key.indexOf(CACHE_PREFIX) === 0 && key.indexOf(current) !== 0) {
+                storage.removeItem(key);
+            }
+        }
+    }
+
+    function cacheKey(pathname) {
+        return CACHE_PREFIX + getConfig().version + ':' + pathname;
+    }
+
+    // cache entries hold the body of the router response along with the
+    // pathnames of the neighbouring pages to prefetch
+
+    function cacheGet(pathname) {
+        var key = cacheKey(pathname);
+        if (key in memoryCache) {
+            return memoryCache[key];
+        }
+        var storage = getStorage();
+        var entry = storage === null ? null : storage.getItem(key);
+        return entry === null ? null : JSON.parse(entry);
+    }
+
+    function cacheSet(pathname, entry) {
+        var key = cacheKey(pathname);
+        memoryCache[key] = entry;
+        var storage = getStorage();
+        if (storage !== null) {
+            try {
+                storage.setItem(key, JSON.stringify(entry));
+            } catch (e) {
+                // quota exceeded; the memory cache still has it
+            }
+        }
+    }
+
+    function getRouterPathname(url, options) {
+        // returns the requested pathname if this is a request to the router
+        // callback, otherwise null
+        if (!options || options.method !== 'POST' || typeof url !== 'string' ||
+            url.indexOf('_dash-update-component') === -1) {
+            return null;
+        }
+        var payload = JSON.parse(options.body);
+        if (payload.output.id !== getConfig().page_element_id ||
+            payload.output.property !== 'children') {
+            return null;
+        }
+        return payload.inputs[0].value;
+    }
+
+    function jsonResponse(text) {
+        return new Response(text, {
+            status: 200,
+            headers: {'Content-Type': 'application/json'}
+        });
+    }
+
+    function storePage(pathname, res) {
+        // caches a router response, resolving to the cache entry or null if
+        // the response can't be cached
+        if (!res.ok || !res.headers.get('X-Xplore-Cacheable')) {
+            return Promise.resolve(null);
+        }
+        var neighbours = res.headers.get('X-Xplore-Prefetch');
+        return res.text().then(function(text) {
+            var entry = {
+                body: text,
+                prefetch: neighbours ? neighbours.split(',') : []
+            };
+            cacheSet(pathname, entry);
+            return entry;
+        });
+    }
+
+    function fetchPage(url, options, pathname) {
+        var cached = cacheGet(pathname);
+        if (cached !== null) {
+            schedulePrefetch(url, options, cached.prefetch);
+            return Promise.resolve(jsonResponse(cached.body));
+        }
+        return nativeFetch(url, options).then(function(res) {
+            storePage(pathname, res.clone()).then(function(entry) {
+                if (entry !== null) {
+                    schedulePrefetch(url, options, entry.prefetch);
+                }
+            });
+            return res;
+        });
+    }
+
+    function schedulePrefetch(url, options, pathnames) {
+        // wait until the browser is idle so as to not hold up the current
+        // page
+        var schedule = window.requestIdleCallback || setTimeout;
+        schedule(function() {
+            prefetchPages(url, options, pathnames.slice());
+        });
+    }
+
+    function withinBudget() {
+        return prefetchedBytes < getConfig().prefetch_max_bytes;
+    }
+
+    function prefetchPages(url, options, pathnames) {
+        // prefetch pages one at a time, closest first, until the byte budget
+        // has been spent
+        if (pathnames.length === 0 || !withinBudget()) {
+            return;
+        }
+        var pathname = pathnames.shift();
+        if (pathname in prefetched || cacheGet(pathname) !== null) {
+            prefetchPages(url, options, pathnames);
+            return;
+        }
+        prefetched[pathname] = true;
+
+        var payload = JSON.parse(options.body);
+        payload.inputs[0].value = pathname;
+        var prefetchOptions = Object.assign({}, options, {
+            body: JSON.stringify(payload)
+        });
+
+        var request;
+        if (getConfig().frozen) {
+            request = fetchFrozenPage(pathname);
+        } else {
+            request = nativeFetch(url, prefetchOptions).then(function(res) {
+                return storePage(pathname, res);
+            });
+        }
+
+        request.then(function(entry) {
+            if (entry !== null) {
+                prefetchedBytes += entry.body.length;
+                prefetchAssets(entry.body);
+            }
+            prefetchPages(url, options, pathnames);
+        }).catch(function() {
+            // prefetching is only ever an optimisation
+        });
+    }
+
+    function findAssetUrls(body) {
+        // returns the URLs of images used by a page layout, both as image
+        // sources and as CSS backgrounds. for images with a srcset, only the
+        // candidate the browser is likely to choose is fetched
+        var urls = [];
+        var pattern = /"data-xplore-srcset": ?"([^"]+)"|"(?:data-xplore-)?src": ?"([^"]+)"|url\((?:\\?["'])?([^"')\\]+)/g;
+        var srcsets = [];
+        var match;
+        while ((match = pattern.exec(body)) !== null) {
+            if (match[1]) {
+                srcsets.push(match[1]);
+                continue;
+            }
+            var assetUrl = match[2] || match[3];
+            if (assetUrl.indexOf('data:') !== 0 && urls.indexOf(assetUrl) === -1) {
+                urls.push(assetUrl);
+            }
+        }
+        if (srcsets.length > 0) {
+            // the srcsets replace the srcs of the same images
+            urls = urls.filter(function(assetUrl) {
+                return !srcsets.some(function(srcset) {
+                    return srcset.indexOf(assetUrl.replace(/^.*?\/static\//, '/')) !== -1;
+                });
+            });
+            srcsets.forEach(function(srcset) {
+                urls.push(chooseCandidate(srcset));
+            });
+        }
+        return urls;
+    }
+
+    function chooseCandidate(srcset) {
+        // the smallest candidate at least as wide as the viewport in device
+        // pixels, or the widest if none are
+        var target = window.innerWidth * (window.devicePixelRatio || 1);
+        var candidates = srcset.split(',').map(function(candidate) {
+            var parts = candidate.trim().split(/\s+/);
+            return {url: parts[0], width: parseInt(parts[1], 10)};
+        }).sort(function(a, b) {
+            return a.width - b.width;
+        });
+        for (var i = 0; i < candidates.length; i++) {
+            if (candidates[i].width >= target) {
+                return candidates[i].url;
+            }
+        }
+        return candidates[candidates.length - 1].url;
+    }
+
+    function prefetchAssets(body) {
+        // fetching the assets populates the browser's HTTP cache. CSS files
+        // need no prefetching as Dash loads all of them up front
+        findAssetUrls(body).forEach(function(assetUrl) {
+            if (assetUrl in prefetched || !withinBudget()) {
+                return;
+            }
+            prefetched[assetUrl] = true;
+            nativeFetch(assetUrl).then(function(res) {
+                return res.blob();
+            }).then(function(blob) {
+                prefetchedBytes += blob.size;
+            }).catch(function() {});
+        });
+    }
+
+    function frozenUrl(path) {
+        return (getConfig().url_prefix || '') + '/_xplore/' + path;
+    }
+
+    function frozenRouteUrl(pathname) {
+        // must match route_file_name in freeze.py, which is given routes
+        // without the deck's URL prefix
+        var prefix = getConfig().url_prefix || '';
+        if (prefix && pathname.indexOf(prefix) === 0) {
+            pathname = pathname.slice(prefix.length);
+        }
+        var name = pathname.replace(/^\/+|\/+$/g, '');
+        if (!name) {
+            return frozenUrl('routes/_index.json');
+        }
+        // each byte other than a letter, digit, '_' or '-' becomes '~' and
+        // its hex code. pathnames are URL encoded, as are the routes that
+        // freeze.py is given, so they aren't decoded first
+        name = encodeURIComponent(name).replace(/[.!~*'()]/g, function(c) {
+            return '%' + c.charCodeAt(0).toString(16).toUpperCase();
+        }).replace(/%/g, '~');
+        return frozenUrl('routes/' + name + '.json');
+    }
+
+    function fetchFrozenPage(pathname) {
+        // resolves to the pre-rendered cache entry for a route, or null
+        return nativeFetch(frozenRouteUrl(pathname)).then(function(res) {
+            if (!res.ok) {
+                return null;
+            }
+            return res.json().then(function(entry) {
+                cacheSet(pathname, entry);
+                return entry;
+            });
+        });
+    }
+
+    function fetchFrozenCallback(payload) {
+        // callbacks of frozen decks are looked up from precomputed tables,
+        // keyed by the values of the callback's inputs and state
+        var output = payload.output.id + '.' + payload.output.property;
+        if (!(output in callbackTables)) {
+            var tableUrl = frozenUrl('callbacks/' + encodeURIComponent(output) + '.json');
+            callbackTables[output] = nativeFetch(tableUrl).then(function(res) {
+                return res.ok ? res.json() : null;
+            });
+        }
+
+        var dependencies = payload.inputs.concat(payload.state || []);
+        return callbackTables[output].then(function(table) {
+            if (table === null) {
+                return new Response('', {status: 404});
+            }
+            // must match the keys created in freeze.py
+            var key = JSON.stringify(table.inputs.map(function(input) {
+                var value = null;
+                dependencies.forEach(function(dep) {
+                    if (dep.id === input[0] && dep.property === input[1] &&
+                        dep.value !== undefined) {
+                        value = dep.value;
+                    }
+                });
+                return value;
+            }));
+            if (!(key in table.outputs)) {
+                return new Response('', {status: 404});
+            }
+            return jsonResponse(JSON.stringify(table.outputs[key]));
+        });
+    }
+
+    function fetchFrozen(url, options) {
+        if (typeof url !== 'string') {
+            return nativeFetch(url, options);
+        }
+        if (/_dash-(layout|dependencies)$/.test(url)) {
+            return nativeFetch(url + '.json', options);
+        }
+
+        var pathname = getRouterPathname(url, options);
+        if (pathname !== null) {
+            var cached = cacheGet(pathname);
+            var request = cached !== null ?
+                Promise.resolve(cached) : fetchFrozenPage(pathname);
+            return request.then(function(entry) {
+                if (entry === null) {
+                    return new Response('', {status: 404});
+                }
+                schedulePrefetch(url, options, entry.prefetch);
+                return jsonResponse(entry.body);
+            });
+        }
+
+        if (url.indexOf('_dash-update-component') !== -1) {
+            return fetchFrozenCallback(JSON.parse(options.body));
+        }
+        return nativeFetch(url, options);
+    }
+
+    // packed arrays
+
+    var ARRAY_KEY = '__xplore_array__';
+    var TYPED_ARRAYS = {
+        int8: Int8Array,
+        int16: Int16Array,
+        int32: Int32Array,
+        uint8: Uint8Array,
+        uint16: Uint16Array,
+        uint32: Uint32Array,
+        float32: Float32Array,
+        float64: Float64Array
+    };
+    // quantized values use the steps below this, which marks missing values
+    var QUANTIZE_MISSING = 65535;
+
+    function decodeArray(packed) {
+        var binary = atob(packed.data);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        var array = new TYPED_ARRAYS[packed.dtype](bytes.buffer);
+        if (packed.scale === undefined) {
+            return array;
+        }
+        var values = new Float64Array(array.length);
+        for (var j = 0; j < array.length; j++) {
+            values[j] = array[j] === QUANTIZE_MISSING ?
+                NaN : packed.offset + array[j] * packed.scale;
+        }
+        return values;
+    }
+
+    function decodeArrays(value) {
+        if (Array.isArray(value)) {
+            return value.map(decodeArrays);
+        }
+        if (value === null || typeof value !== 'object') {
+            return value;
+        }
+        if (ARRAY_KEY in value) {
+            return decodeArray(value[ARRAY_KEY]);
+        }
+        var decoded = {};
+        Object.keys(value).forEach(function(key) {
+            decoded[key] = decodeArrays(value[key]);
+        });
+        return decoded;
+    }
+
+    function withDecodedArrays(res) {
+        // Dash reads callback responses with res.json(), which is replaced
+        // on responses holding packed arrays to return them decoded
+        if (!res.ok) {
+            return Promise.resolve(res);
+        }
+        return res.clone().text().then(function(text) {
+            if (text.indexOf(ARRAY_KEY) === -1) {
+                return res;
+            }
+            var decoded = decodeArrays(JSON.parse(text));
+            res.json = function() {
+                return Promise.resolve(decoded);
+            };
+            return res;
+        });
+    }
+
+    function isCallbackRequest(url, options) {
+        return options && options.method === 'POST' && typeof url === 'string' &&
+            url.indexOf('_dash-update-component') !== -1;
+    }
+
+    // lazily loaded images
+
+    var imageObserver = null;
+
+    function loadImage(img) {
+        img.decoding = 'async';
+        var srcset = img.getAttribute('data-xplore-srcset');
+        if (srcset) {
+            img.srcset = srcset;
+        }
+        img.src = img.getAttribute('data-xplore-src');
+    }
+
+    function watchImage(img) {
+        if (imageObserver === null) {
+            loadImage(img);
+        } else {
+            imageObserver.observe(img);
+        }
+    }
+
+    function watchImages(root) {
+        if (root.nodeType !== 1) {
+            return;
+        }
+        if (root.hasAttribute('data-xplore-src')) {
+            watchImage(root);
+        }
+        var images = root.querySelectorAll('img[data-xplore-src]');
+        for (var i = 0; i < images.length; i++) {
+            watchImage(images[i]);
+        }
+    }
+
+    function initLazyImages() {
+        if ('IntersectionObserver' in window) {
+            imageObserver = new IntersectionObserver(function(entries) {
+                entries.forEach(function(entry) {
+                    if (entry.isIntersecting) {
+                        imageObserver.unobserve(entry.target);
+                        loadImage(entry.target);
+                    }
+                });
+            }, {rootMargin: '200px'});
+        }
+
+        // Dash renders pages after the document has loaded, and may reuse
+        // an img element for a different image when changing page
+        new MutationObserver(function(mutations) {
+            mutations.forEach(function(mutation) {
+                if (mutation.type === 'attributes') {
+                    watchImage(mutation.target);
+                } else {
+                    for (var i = 0; i < mutation.addedNodes.length; i++) {
+                        watchImages(mutation.addedNodes[i]);
+                    }
+                }
+            });
+        }).observe(document.body, {
+            childList: true,
+            subtree: true,
+            attributes: true,
+            attributeFilter: ['data-xplore-src', 'data-xplore-srcset']
+        });
+        watchImages(document.body);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', initLazyImages);
+    } else {
+        initLazyImages();
+    }
+
+    function xploreFetch(url, options) {
+        if (getConfig().frozen) {
+            return fetchFrozen(url, options);
+        }
+        if (getConfig().client_cache) {
+            var pathname = getRouterPathname(url, options);
+            if (pathname !== null) {
+                return fetchPage(url, options, pathname);
+            }
+        }
+        return nativeFetch(url, options);
+    }
+
+    window.fetch = function(url, options) {
+        var request = xploreFetch(url, options);
+        if (getConfig().figure_arrays && isCallbackRequest(url, options) &&
+            getRouterPathname(url, options) === null) {
+            return request.then(withDecodedArrays);
+        }
+        return request;
+    };
+
+})();
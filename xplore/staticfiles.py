@@ -0,0 +1,200 @@
+import io
+import os
+import gzip
+import hashlib
+import mimetypes
+from threading import Lock
+
+from flask import Response, request, abort
+
+try:
+    from werkzeug.utils import safe_join
+except ImportError:
+    # older versions of werkzeug
+    from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from . import config
+
+
+# types worth compressing. other types, such as images and woff fonts, are
+# compressed already
+COMPRESSIBLE_TYPES = {
+    'application/javascript',
+    'application/json',
+    'application/vnd.ms-fontobject',
+    'application/x-font-ttf',
+    'application/xml',
+    'font/otf',
+    'font/ttf',
+    'image/svg+xml',
+}
+
+FONT_TYPES = {
+    '.eot': 'application/vnd.ms-fontobject',
+    '.otf': 'font/otf',
+    '.ttf': 'font/ttf',
+    '.woff': 'font/woff',
+    '.woff2': 'font/woff2',
+}
+
+# files smaller than this aren't worth compressing
+MIN_COMPRESS_BYTES = 256
+
+# the encodings offered, in order of preference
+ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+class CompressedFile:
+    """
+    The contents of a file along with its precompressed variants and a
+    strong ETag for each of them.
+    """
+
+    def __init__(self, body, mimetype, stamp=None):
+        self.mimetype = mimetype
+        self.stamp = stamp
+        self.hash = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {'identity': body}
+
+        if _is_compressible(mimetype) and len(body) >= MIN_COMPRESS_BYTES:
+            for encoding in ENCODINGS:
+                compressed = _compress(body, encoding)
+                # only keep variants that are actually smaller
+                if len(compressed) < len(body):
+                    self.variants[encoding] = compressed
+
+    def etag(self, encoding):
+        # each representation must have its own strong ETag
+        if encoding == 'identity':
+            return self.hash
+        return f'{self.hash}-{encoding}'
+
+    def choose_encoding(self, accept_encoding):
+        """Returns the best available encoding accepted by the client"""
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.variants and accepted.get(encoding, 0) > 0:
+                return encoding
+        return 'identity'
+
+    def make_response(self, cache_control):
+        """
+        Returns a response for the current request, using the encoding it
+        accepts and answering a matching If-None-Match with a 304.
+        """
+        encoding = self.choose_encoding(request.headers.get('Accept-Encoding', ''))
+        etag = self.etag(encoding)
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.variants[encoding], mimetype=self.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        if len(self.variants) > 1:
+            response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class StaticFiles:
+    """
+    Serves the files in a directory with gzip and, if the brotli package is
+    installed, brotli compressed variants, chosen according to the request's
+    Accept-Encoding header, and with strong ETags for conditional requests.
+
+    Files are read and compressed the first time they're requested, or all
+    at once by precompress, and are held in memory until they change on
+    disk.
+    """
+
+    def __init__(self, root, max_age=None):
+        self.root = root
+        self.max_age = config.STATIC_MAX_AGE if max_age is None else max_age
+        self._files = {}
+        self._lock = Lock()
+
+    def send(self, path):
+        """Returns a response for the file at path, relative to the root"""
+        file_path = safe_join(self.root, path)
+        if file_path is None or not os.path.isfile(file_path):
+            abort(404)
+        return self.get(file_path).make_response(self.cache_control)
+
+    def get(self, file_path):
+        stat = os.stat(file_path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        compressed_file = self._files.get(file_path)
+        if compressed_file is None or compressed_file.stamp != stamp:
+            with open(file_path, 'rb') as f:
+                body = f.read()
+            compressed_file = CompressedFile(body, guess_type(file_path), stamp)
+            with self._lock:
+                self._files[file_path] = compressed_file
+        return compressed_file
+
+    def precompress(self):
+        """Reads and compresses every file under the root"""
+        for current, _, files in os.walk(self.root):
+            for name in files:
+                self.get(os.path.join(current, name))
+
+    @property
+    def cache_control(self):
+        if self.max_age:
+            return f'public, max-age={self.max_age}'
+        # always revalidate, which is cheap given the ETags
+        return 'public, no-cache'
+
+
+def guess_type(file_path):
+    # fonts aren't known to the mimetypes module on every platform
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in FONT_TYPES:
+        return FONT_TYPES[extension]
+    mimetype, _ = mimetypes.guess_type(file_path)
+    return mimetype or 'application/octet-stream'
+
+
+def _is_compressible(mimetype):
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body)
+    # a fixed mtime keeps the output the same from run to run
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as f:
+        f.write(body)
+    return buffer.getvalue()
+
+
+def _parse_accept_encoding(header):
+    # maps each accepted encoding onto its quality value
+    accepted = {}
+    for part in header.split(','):
+        encoding, _, params = part.strip().partition(';')
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[encoding] = quality
+
+    if '*' in accepted:
+        for encoding in ENCODINGS:
+            accepted.setdefault(encoding, accepted['*'])
+    return accepted
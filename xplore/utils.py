@@ -1,6 +1,10 @@
 import re
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
 from collections import defaultdict, Mapping, Iterable
 
+import plotly
 from dash.development.base_component import Component
 
 from .exceptions import ValidationException
@@ -73,23 +77,295 @@ def camel_case_to_title(token):
     return " ".join(new_words)
 
 
-def add_content(layout, content):
+def encode_json(obj):
+    """
+    Encodes an object containing Dash components as UTF-8 JSON, in the same
+    way that Dash encodes callback responses.
+    """
+    return json.dumps(obj, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8')
+
+
+# the URL prefix of the deck whose layout or callback output is being
+# encoded. components holding URLs on the deck's own server, such as Image,
+# add it when they're encoded, as they may be created before the deck is
+_url_prefix = ContextVar('xplore_url_prefix', default='')
+
+# CSS url() values holding absolute paths, but not protocol relative URLs
+CSS_URL_PATH_RE = re.compile(r"""url\((["']?)/(?!/)""")
+
+
+@contextmanager
+def deck_url_prefix(prefix):
+    """Sets the URL prefix that prefix_url adds, for the duration"""
+    token = _url_prefix.set(prefix)
+    try:
+        yield
+    finally:
+        _url_prefix.reset(token)
+
+
+def prefix_url(url):
+    """
+    Returns a URL on the deck's server, eg /static/img/a.png, with the
+    prefix of the deck currently being encoded, if any
+    """
+    prefix = _url_prefix.get()
+    if prefix and url.startswith('/') and not url.startswith('//'):
+        return prefix + url
+    return url
+
+
+def prefix_css_urls(css):
+    """Adds the prefix of the deck being encoded to paths in CSS url()s"""
+    prefix = _url_prefix.get()
+    if not prefix:
+        return css
+    return CSS_URL_PATH_RE.sub(lambda m: f'url({m.group(1)}{prefix}/', css)
+
+
+class LayoutIndex:
+    """
+    Maps element IDs onto the components that hold them, so that elements
+    can be found and replaced without walking the layout tree, as Dash's
+    component __getitem__ and __setitem__ do.
+
+    Each entry records the parent of the element and its position in the
+    parent's children, or None if the element is the parent's only child.
+    Entries are checked before use, so an index that has gone stale because
+    the layout was changed behind its back is never wrong, only slower.
+
+    The index also tracks which subtrees of the layout are shared with other
+    layouts, such as the class-level content of a Block, so that they can be
+    copied on write rather than changed in place.
+    """
+
+    def __init__(self):
+        self._parents = {}
+        # id -> component maps, holding the components so that their ids
+        # can't be reused
+        self._shared = {}
+        self._private = {}
+
+    def add(self, id_name, parent, position=None):
+        self._parents[id_name] = (parent, position)
+
+    def update(self, other):
+        if other is not None:
+            self._parents.update(other._parents)
+            self._shared.update(other._shared)
+            self._private.update(other._private)
+
+    def share(self, component):
+        """Marks component and its subtree as shared with other layouts"""
+        if isinstance(component, Component):
+            self._shared[id(component)] = component
+
+    def copy_on_write(self, path):
+        """
+        Copies the components on path, a list of components from the root of
+        the layout downwards, that lie within shared subtrees, relinking each
+        copy into its parent. Returns the last component on the path, or its
+        copy, which is then safe to change.
+        """
+        path = list(path)
+        in_shared = False
+        for i, node in enumerate(path):
+            is_root = id(node) in self._shared
+            in_shared = in_shared or is_root
+            if i == 0 or not in_shared or id(node) in self._private:
+                continue
+
+            clone = copy_component(node)
+            _replace_child(path[i-1], node, clone)
+            self._private[id(clone)] = clone
+            if is_root:
+                # the copy still roots a subtree of shared components
+                self._shared[id(clone)] = clone
+            path[i] = clone
+        return path[-1]
+
+    def get(self, id_name):
+        """Returns the element with the ID, or None if it isn't indexed"""
+        entry = self._parents.get(id_name)
+        if entry is None:
+            return None
+        parent, position = entry
+        children = getattr(parent, 'children', None)
+        if position is None:
+            element = children
+        elif isinstance(children, list) and position < len(children):
+            element = children[position]
+        else:
+            element = None
+
+        if getattr(element, 'id', None) != id_name:
+            del self._parents[id_name]
+            return None
+        return element
+
+    def replace(self, id_name, value):
+        """
+        Replaces the element with the ID with value, returning whether the
+        element was found in the index.
+        """
+        if self.get(id_name) is None:
+            return False
+        parent, position = self._parents.pop(id_name)
+        if position is None:
+            parent.children = value
+        else:
+            parent.children[position] = value
+        return True
+
+    def items(self):
+        # (id, (parent, position)) pairs, which aren't checked
+        return self._parents.items()
+
+    def __contains__(self, id_name):
+        return self.get(id_name) is not None
+
+
+def get_layout_index(layout):
+    """Returns the LayoutIndex built along with a layout, if there is one"""
+    return getattr(layout, '_layout_index', None)
+
+
+def set_layout_index(layout, index):
+    # attributes that aren't Dash props are ignored when encoding
+    layout._layout_index = index
+
+
+def copy_component(component):
+    """
+    Returns a shallow copy of a Dash component, with its own list of
+    children but sharing the children themselves.
+    """
+    # bypass the component's __init__, which validates every prop
+    clone = object.__new__(type(component))
+    clone.__dict__.update(component.__dict__)
+    # any index belongs to the original layout
+    clone.__dict__.pop('_layout_index', None)
+    if isinstance(clone.__dict__.get('children'), list):
+        clone.children = list(clone.children)
+    return clone
+
+
+def _replace_child(parent, child, new_child):
+    if parent.children is child:
+        parent.children = new_child
+    else:
+        position = next(i for i, item in enumerate(parent.children)
+                        if item is child)
+        parent.children[position] = new_child
+
+
+def _find_path(layout, id_name):
+    # returns the components from layout down to the parent of the element
+    # with the ID, along with the element's position in the parent's
+    # children, or None if there's no such element. searches in the same
+    # order as Dash's component __getitem__
+    path = []
+
+    def search(node):
+        path.append(node)
+        children = getattr(node, 'children', None)
+        if isinstance(children, Component):
+            if getattr(children, 'id', None) == id_name:
+                return None
+            found = search(children)
+            if found is not False:
+                return found
+        elif isinstance(children, list):
+            for i, child in enumerate(children):
+                if getattr(child, 'id', None) == id_name:
+                    return i
+                if isinstance(child, Component):
+                    found = search(child)
+                    if found is not False:
+                        return found
+        path.pop()
+        return False
+
+    position = search(layout)
+    if position is False:
+        return None
+    return path, position
+
+
+def find_element(layout, id_name, index=None):
+    """
+    Returns the element with the ID in layout, or None if there isn't one,
+    using index where possible.
+    """
+    if index is None:
+        index = get_layout_index(layout)
+    if index is not None:
+        element = index.get(id_name)
+        if element is not None:
+            return element
+    try:
+        return layout[id_name]
+    except KeyError:
+        return None
+
+
+def replace_element(layout, id_name, value, index=None):
+    """
+    Replaces the element with the ID in layout with value, using index where
+    possible. Raises KeyError if there is no such element.
+    """
+    if index is None:
+        index = get_layout_index(layout)
+    if index is not None and index.replace(id_name, value):
+        return
+
+    found = _find_path(layout, id_name)
+    if found is None:
+        raise KeyError(id_name)
+    path, position = found
+
+    # the element may be inside a shared subtree, which mustn't be changed
+    parent = path[-1] if index is None else index.copy_on_write(path)
+    if position is None:
+        parent.children = value
+    else:
+        parent.children[position] = value
+
+
+def add_content(layout, content, index=None):
     # note that we always replace the content-ID element
     # to reduce chance of collisions later
+    #
+    # the content-ID elements are looked up in index, or the index built
+    # along with layout, falling back to searching the layout tree
+    #
+    # content is inserted as is rather than copied, so it's marked as shared
+    # in the index. later changes within it copy the path being changed
+    # rather than altering the original, which is typically a Block's
+    # class-level content and so shared by every instance of the Block.
+    if index is None:
+        index = get_layout_index(layout)
+    if index is None:
+        index = LayoutIndex()
+        set_layout_index(layout, index)
+
+    def insert(id_name, value):
+        index.share(value)
+        replace_element(layout, id_name, value, index)
 
     if isinstance(content, Component):
         # content is a single Dash Component
-        layout['content-1'] = content
+        insert('content-1', content)
     elif isinstance(content, Mapping):
         # content is a dict-like object with element-ID keys and components as
         # values
         for id_name, value in content.items():
-            layout[id_name] = value
+            insert(id_name, value)
     elif isinstance(content, Iterable):
         # content is an iterable
         for i, value in enumerate(content):
-            layout['content-{}'.format(i+1)] = value
+            insert('content-{}'.format(i+1), value)
     else:
-        msgs = "'content' param must be a dict-like object, iterable, " \
-               "or Dash Component"
+        msg = "'content' param must be a dict-like object, iterable, " \
+              "or Dash Component"
         raise ValidationException(msg)
@@ -1,5 +1,8 @@
 import sys
 import os
+import json
+import hashlib
+from contextlib import nullcontext
 import random
 import string
 import importlib
@@ -12,10 +15,20 @@ import dash_html_components as html
 from dash import Dash
 from dash.dependencies import Input, Output
 from dash.development.base_component import Component
-from flask import Flask, send_from_directory
+from flask import Flask, Response, abort
 
-from . import layouts, utils, config
+from . import layouts, utils, config, __version__
 from .exceptions import ValidationException
+from .datastore import DataStore
+from .datacache import DataCache
+from .cache import CallbackCache
+from .profiling import StartupProfile
+from .metrics import Metrics, UNKNOWN_ROUTE, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .assets import Asset, Bundle, build_bundles, xplore_static_path
+from .staticfiles import StaticFiles, CompressedFile
+from .images import ImageVariants
+from .parallel import check_concurrency, materialise_pages
+from .refresh import DataRefresher
 
 # Grand plan:
 #
@@ -36,25 +49,88 @@ class Xplorable:
             server=None,
             static_folder='static',
             index_page_type='first',
-            route_not_found_layout=None):
+            route_not_found_layout=None,
+            lazy=False,
+            client_cache=True,
+            prefetch_depth=1,
+            prefetch_max_bytes=2*1024*1024,
+            data_store=None,
+            data_cache=None,
+            callback_cache_bytes=64*1024*1024,
+            profile=False,
+            metrics=False,
+            bundle_assets=False,
+            precompress_static=False,
+            concurrency=None,
+            max_workers=None,
+            url_prefix=None,
+            host=None):
 
         self.static_folder = static_folder
+        self.url_prefix = _normalise_prefix(url_prefix)
+        self.host = host
+        self.lazy = lazy
+        self.client_cache = client_cache
+        self.prefetch_depth = prefetch_depth
+        self.prefetch_max_bytes = prefetch_max_bytes
+        self.data_store = data_store
+        self.data_cache = data_cache
+        self.callback_cache = CallbackCache(callback_cache_bytes)
+        self.startup_profile = StartupProfile() if profile else None
+        self.metrics = Metrics() if metrics else None
+        self.bundle_assets = bundle_assets
+        self.bundles = {}
+        self.precompress_static = precompress_static
+        check_concurrency(concurrency)
+        if concurrency is not None and lazy:
+            raise ValidationException("'concurrency' param can't be used with 'lazy'")
+        self.concurrency = concurrency
+        self.max_workers = max_workers
         self.route_not_found_layout = route_not_found_layout
         self.index_page_type = index_page_type
 
         if server is None:
             server = self._make_flask_server()
 
-        self.app = Dash(name=__name__, server=server)
+        # with a prefix, the app is mounted below the root of the server,
+        # eg by an XploreHost, which strips the prefix before routing
+        dash_kwargs = {}
+        if self.url_prefix:
+            dash_kwargs['requests_pathname_prefix'] = self.url_prefix + '/'
+        self.app = Dash(name=__name__, server=server, **dash_kwargs)
         self.app.config.suppress_callback_exceptions = True
-        self._init_pages()
-        self._init_app()
-        self._register_routes()
+
+        with self._timed('_init_pages'):
+            self._init_pages()
+        with self._timed('_init_app'):
+            self._init_app()
+        with self._timed('_register_routes'):
+            self._register_routes()
 
         # finalise each page with stuff that has to happen after the creation of
         # all the pages
-        for page in self.page_list:
-            page.finalise()
+        with self._timed('finalise'):
+            for page in self.page_list:
+                page.finalise()
+
+        # layouts can't change once finalised, so they can be encoded now
+        # rather than on every request. lazy pages are encoded on first visit
+        if not self.lazy:
+            with self._timed('encode'):
+                for route in self.routes:
+                    self._get_encoded_route(route)
+
+        self.layout_version = self._get_layout_version()
+        self._init_client_config()
+
+        if self.metrics is not None:
+            self._init_metrics()
+
+        # pages with a refresh policy have their data reloaded in the
+        # background, by a thread started on each process's first request
+        self.data_refresher = DataRefresher(self.page_list)
+        if self.data_refresher.blocks:
+            self.app.server.before_request(self.data_refresher.ensure_started)
 
     def _make_flask_server(self):
         # create a Flask instance, giving it the static folder to use 
@@ -66,23 +142,49 @@ class Xplorable:
     def _init_pages(self):
         self.page_list = []
         prev_page = None
+        if self.data_store is None and any(cls.shared_data for cls in self.pages):
+            self.data_store = DataStore()
+
+        if self.data_cache is None and any(cls.cache_data for cls in self.pages):
+            cache_path = os.path.join(self.project_path, config.DATA_CACHE_PATH)
+            self.data_cache = DataCache(cache_path)
+
+        # pages built concurrently are created unmaterialised, then built
+        # all at once. their callbacks, which may use their data, are only
+        # registered once every page is built
+        concurrent = self.concurrency is not None
+
         for i, cls in enumerate(self.pages):
             # create the page
-            page = cls(self.app, i + 1, self.project_path)
+            page = cls(self.app, i + 1, self.project_path,
+                       lazy=self.lazy or concurrent,
+                       data_store=self.data_store, data_cache=self.data_cache,
+                       callback_cache=self.callback_cache,
+                       profile=self.startup_profile,
+                       defer_callbacks=concurrent,
+                       url_prefix=self.url_prefix)
 
             if prev_page is not None:
-                # link this page to the last one
-                page.prev_page = prev_page
-                prev_page.next_page = page
+                # link this page to the last one. families of pages are
+                # linked through their first and last members
+                page.prev_page = prev_page.last_page
+                prev_page.next_page = page.first_page
 
             self.page_list.append(page)
             prev_page = page
 
         # link the last page to the first page    
-        prev_page.next_page = self.page_list[0]
+        prev_page.next_page = self.page_list[0].first_page
 
         # link the first page to the last page
-        self.page_list[0].prev_page = prev_page
+        self.page_list[0].prev_page = prev_page.last_page
+
+        if concurrent:
+            materialise_pages(self.page_list, self.concurrency,
+                              self.max_workers, self.startup_profile)
+            for page in self.page_list:
+                with page._timed('_init_callbacks'):
+                    page._init_callbacks()
         
     def _init_app(self):
         self.app.title = self.title
@@ -94,49 +196,328 @@ class Xplorable:
         @self.app.callback(Output(config.PAGE_ELEMENT_ID, 'children'),
               [Input('url', 'pathname')])
         def display_page(pathname):
-            if self.route_not_found_layout is None:
-                default_layout = html.P("No page '{}'".format(pathname))
-            else:
-                default_layout = self.route_not_found_layout(pathname)
-
             # look up the path name from the routes
-            return self.routes.get(pathname, default_layout)
+            page = self._get_page(self._get_route(pathname))
+
+            if page is None:
+                if self.route_not_found_layout is None:
+                    return html.P("No page '{}'".format(pathname))
+                return self.route_not_found_layout(pathname)
+
+            # lazily created pages are only built the first time they are
+            # requested
+            page.materialise()
+            return page.layout
+
+        # Dash would otherwise encode the whole layout tree on every
+        # navigation. swap in a router that serves pre-encoded responses,
+        # falling back to display_page for unknown routes
+        router_id = '{}.children'.format(config.PAGE_ELEMENT_ID)
+        self._display_page = self.app.callback_map[router_id]['callback']
+        self.app.callback_map[router_id]['callback'] = self._serve_page
+
+        # register xplore's static route with Flask. files are served
+        # compressed where the client accepts it, with ETags. decks mounted
+        # on an XploreHost share the host's copy
+        if self.host is not None:
+            self.static_files = self.host.static_files
+        else:
+            self.static_files = StaticFiles(
+                os.path.join(self.xplore_base_path, config.STATIC_PATH))
+        if self.precompress_static:
+            with self._timed('precompress_static'):
+                self.static_files.precompress()
 
-        # register xplore's static route with Flask
         @self.app.server.route('{}/xplore/<path:path>'.format(
             self.app.server.static_url_path))
         def send_static(path):
-            static_path = os.path.join(self.xplore_base_path,
-                                       config.STATIC_PATH)
-            return send_from_directory(static_path, path)
+            return self.static_files.send(path)
+
+        # resized variants of the project's images, used by Image and
+        # BackgroundImage components
+        self.images = ImageVariants(
+            self.app.server.static_folder,
+            os.path.join(self.project_path, config.IMAGE_CACHE_PATH))
 
-        # register all CSS files with app
-        for css_path in self.all_css_files:
-            full_css_path = self._get_asset_path(css_path) 
-            self.app.css.append_css({"external_url": full_css_path})
+        @self.app.server.route('{}/<int:width>/<path:src>'.format(config.IMAGE_URL))
+        def send_image(width, src):
+            return self.images.send(width, src)
 
-        # register all JS files with app
-        for js_path in self.all_js_files:
-            full_js_path = self._get_asset_path(js_path) 
-            self.app.scripts.append_script({"external_url": full_js_path})
+        with self._timed('asset_registration'):
+            if self.bundle_assets:
+                self._register_bundles()
+            else:
+                # register all CSS files with app
+                for css_path in self.all_css_files:
+                    full_css_path = self._get_asset_path(css_path) 
+                    self.app.css.append_css({"external_url": full_css_path})
+
+                # register all JS files with app
+                for js_path in self.all_js_files:
+                    full_js_path = self._get_asset_path(js_path) 
+                    self.app.scripts.append_script({"external_url": full_js_path})
+
+    def _register_bundles(self):
+        # concatenate the CSS and JS files into bundles named by the hash of
+        # their contents, which can then be cached by browsers forever. CSS
+        # is minified on the way, JS isn't.
+        #
+        # decks mounted on an XploreHost keep xplore's own files in separate
+        # bundles, which are then the same for every deck and are served
+        # once by the host
+        if self.host is not None:
+            self._bundle_files = self.host.bundle_files
+            bundle_url = config.BUNDLE_URL
+        else:
+            self._bundle_files = {}
+            bundle_url = self.url_prefix + config.BUNDLE_URL
+
+        registrations = [
+            ('css', self.all_css_files, self.app.css.append_css),
+            ('js', self.all_js_files, self.app.scripts.append_script),
+        ]
+        for kind, paths, register in registrations:
+            paths = list(paths)
+            groups = [paths]
+            if self.host is not None:
+                groups = [[path for path in paths if path.startswith('xplore/')],
+                          [path for path in paths if not path.startswith('xplore/')]]
+            for group in groups:
+                assets = [self._get_asset(path) for path in group]
+                for item in build_bundles(assets, kind):
+                    if isinstance(item, Bundle):
+                        self.bundles[item.name] = item
+                        if item.name not in self._bundle_files:
+                            self._bundle_files[item.name] = CompressedFile(
+                                item.body, item.mimetype)
+                        url = '{}/{}'.format(bundle_url, item.name)
+                    else:
+                        url = item
+                    register({"external_url": url})
+
+        if self.host is not None:
+            return
+
+        @self.app.server.route('{}/<name>'.format(config.BUNDLE_URL))
+        def send_bundle(name):
+            bundle_file = self._bundle_files.get(name)
+            if bundle_file is None:
+                abort(404)
+            return bundle_file.make_response(
+                'public, max-age=31536000, immutable')
+
+    def _init_metrics(self):
+        # wrap every registered callback, including the router, so that its
+        # calls are recorded
+        router_id = '{}.children'.format(config.PAGE_ELEMENT_ID)
+        for callback_id, callback_spec in self.app.callback_map.items():
+            get_route = self._get_route_label if callback_id == router_id else None
+            callback_spec['callback'] = self.metrics.wrap_callback(
+                callback_spec['callback'], callback_id, get_route=get_route)
+
+        @self.app.server.route(config.METRICS_URL)
+        def send_metrics():
+            return Response(self.metrics.render(),
+                            content_type=METRICS_CONTENT_TYPE)
+
+    def _get_route(self, pathname):
+        # the route of a pathname requested by the browser, which includes
+        # any URL prefix
+        if not self.url_prefix or not isinstance(pathname, str):
+            return pathname
+        if pathname == self.url_prefix:
+            return '/'
+        if pathname.startswith(self.url_prefix + '/'):
+            return pathname[len(self.url_prefix):]
+        return pathname
+
+    def _get_page(self, route):
+        # returns the page with the route, which may be a member of a family
+        # of pages, or None if there isn't one
+        page = self.routes.get(route)
+        if page is not None:
+            return page.get_member(page.url) if page.is_family else page
+        for family in self.families:
+            member = family.get_member(route)
+            if member is not None:
+                return member
+        return None
+
+    def _get_route_label(self, pathname):
+        # requests for the same page by different routes are counted together,
+        # as are requests for any member of a family of pages. the page isn't
+        # looked up, as that builds family members outside the timed call
+        route = self._get_route(pathname)
+        page = self.routes.get(route)
+        if page is not None:
+            return page.url_pattern if page.is_family else page.url
+        for family in self.families:
+            if family.has_member(route):
+                return family.url_pattern
+        return UNKNOWN_ROUTE
+
+    def _timed(self, phase, page=None):
+        # times a phase of building the deck when profiling
+        if self.startup_profile is None:
+            return nullcontext()
+        return self.startup_profile.phase(phase, page=page)
+
+    def _serve_page(self, pathname):
+        route = self._get_route(pathname)
+        page = self._get_page(route)
+        if page is None:
+            with utils.deck_url_prefix(self.url_prefix):
+                return self._display_page(pathname)
+        body = self._get_encoded_route(route)
+        headers = {}
+        if self.client_cache:
+            headers['X-Xplore-Cacheable'] = '1'
+            if self.prefetch_depth:
+                neighbours = self._get_neighbour_routes(page)
+                headers['X-Xplore-Prefetch'] = ','.join(neighbours)
+        return Response(body, mimetype='application/json', headers=headers)
+
+    def _get_neighbour_routes(self, page):
+        # pathnames of the pages within prefetch_depth steps of the page,
+        # with the closest pages first
+        neighbours = []
+        next_page, prev_page = page, page
+        for _ in range(self.prefetch_depth):
+            next_page, prev_page = next_page.next_page, prev_page.prev_page
+            for neighbour in (next_page, prev_page):
+                if neighbour.href != page.href and neighbour.href not in neighbours:
+                    neighbours.append(neighbour.href)
+        return neighbours
+
+    def _get_encoded_route(self, route):
+        # returns the router callback response for a route as JSON encoded
+        # bytes, encoding the page's layout the first time it's requested.
+        # members of families of pages hold their own encoded layouts, so
+        # that they're dropped along with the member
+        body = self.encoded_routes.get(route)
+        if body is not None:
+            return body
+
+        page = self._get_page(route)
+        if route not in self.routes:
+            if page.encoded_layout is None:
+                page.encoded_layout = self._encode_page(page)
+            return page.encoded_layout
+
+        body = self._encode_page(page)
+        # all routes pointing at the same page share the encoded layout. a
+        # family's routes point at its first member
+        for other_route, other_page in self.routes.items():
+            if other_page.is_family:
+                same_page = (getattr(page, 'family', None) is other_page and
+                             page.url == other_page.url)
+            else:
+                same_page = other_page is page
+            if same_page:
+                self.encoded_routes[other_route] = body
+        return body
+
+    def _encode_page(self, page):
+        page.materialise()
+        response = {
+            'response': {
+                'props': {'children': page.layout}
+            }
+        }
+        with self._timed('encode', page), utils.deck_url_prefix(self.url_prefix):
+            return utils.encode_json(response)
+
+    def _get_layout_version(self):
+        # a hash identifying the current layouts of the pages. in lazy mode
+        # the layouts haven't been built yet, so the source files of the
+        # pages are used instead, along with the data sources they're built
+        # from. either way the version of xplore and the contents of the CSS
+        # and JS files are included, as layouts depend on them too
+        hasher = hashlib.sha1()
+        hasher.update(__version__.encode('utf-8'))
+        for path in chain(self.all_css_files, self.all_js_files):
+            hasher.update(path.encode('utf-8'))
+            file_path = self._get_asset(path).file_path
+            if file_path is not None and os.path.isfile(file_path):
+                with open(file_path, 'rb') as f:
+                    hasher.update(f.read())
+
+        for page in self.page_list:
+            for source in page._get_data_sources():
+                try:
+                    stat = os.stat(source)
+                    stamp = f'{source}:{stat.st_size}:{stat.st_mtime_ns}'
+                except OSError:
+                    stamp = f'{source}:missing'
+                hasher.update(stamp.encode('utf-8'))
+
+        for route in sorted(self.routes):
+            hasher.update(route.encode('utf-8'))
+            if self.lazy:
+                source_path = inspect.getsourcefile(type(self.routes[route]))
+                with open(source_path, 'rb') as f:
+                    hasher.update(f.read())
+            else:
+                hasher.update(self.encoded_routes[route])
+
+        # members of families of pages are built on request, so the source
+        # and parameters of the family are used
+        for family in self.families:
+            hasher.update('\n'.join(family.routes).encode('utf-8'))
+            source_path = inspect.getsourcefile(type(family))
+            with open(source_path, 'rb') as f:
+                hasher.update(f.read())
+        return hasher.hexdigest()[:16]
+
+    def _init_client_config(self):
+        # embed the config used by xplore.js in the index page
+        self.client_config = {
+            'version': self.layout_version,
+            'page_element_id': config.PAGE_ELEMENT_ID,
+            'client_cache': self.client_cache,
+            'prefetch_max_bytes': self.prefetch_max_bytes,
+            'url_prefix': self.url_prefix,
+            'figure_arrays': any(page.figure_encoding is not None
+                                 for page in self.page_list),
+            'frozen': False,
+        }
+        self.app.index_string = self.app.index_string.replace(
+            '{%config%}', '{%config%}\n' + self.client_config_html())
+
+    def client_config_html(self, **overrides):
+        """Returns the script tag holding the config used by xplore.js"""
+        client_config = dict(self.client_config, **overrides)
+        return '<script id="{}" type="application/json">{}</script>'.format(
+            config.CLIENT_CONFIG_ELEMENT_ID,
+            json.dumps(client_config)
+        )
 
     def _register_routes(self):
         self.routes = {}
+        self.encoded_routes = {}
+        self.families = []
         for page in self.page_list:
-            # register long route: eg /the-page-name, /another-page
-            route = self._register_route(page.url, page.layout)
-            # update the page url in case it was assigned a different route 
-            page.url = route
+            if page.is_family:
+                # members are routed by the family's url_pattern. the short
+                # route leads to the first member
+                self.families.append(page)
+            else:
+                # register long route: eg /the-page-name, /another-page
+                route = self._register_route(page.url, page)
+                # update the page url in case it was assigned a different route 
+                page.url = route
             # register short route: eg /1, /2, /3
-            self._register_route(f'/{str(page.index)}', page.layout)
+            self._register_route(f'/{str(page.index)}', page)
 
         self._set_index_route()
             
-    def _register_route(self, route, layout):
+    def _register_route(self, route, page):
+        # routes map onto pages rather than layouts so that lazily created
+        # pages can be built on first request
         if route in self.routes:
             suffix = ''.join(random.choices(string.ascii_letters, k=5))
             route = f'{route}-{suffix}'
-        self.routes[route] = layout
+        self.routes[route] = page
         return route
 
     def _set_index_route(self):
@@ -144,7 +525,7 @@ class Xplorable:
         # of the story. otherwise, a layout is created according to the value 
         # of config.index_page_type
         if self.index_page_type == 'first':
-            self.index_page_layout = self.page_list[0].layout
+            self.index_page = self.page_list[0]
         elif self.index_page_type == 'outline':
             # TODO
             pass
@@ -154,7 +535,7 @@ class Xplorable:
         else:
             msg = "'index_page_type' param must be one of {}"
             raise ValidationException(msg.format("'first', 'outline', or 'vertical'"))
-        self._register_route('/', self.index_page_layout)
+        self._register_route('/', self.index_page)
             
     def _get_layout(self):
         # where should this go??
@@ -183,10 +564,25 @@ class Xplorable:
 
         return layout
         
+    def _get_asset(self, path):
+        # locates a CSS or JS file on disk, if it's not an external URL
+        file_path = None
+        if not path.startswith('http'):
+            if path.startswith('xplore/'):
+                file_path = xplore_static_path(path[len('xplore/'):])
+            elif self.app.server.static_folder is not None:
+                file_path = os.path.join(self.app.server.static_folder, path)
+        return Asset(path, self._get_asset_path(path), file_path)
+
     def _get_asset_path(self, path):
         if path.startswith('http'):
             return path
-        return '{}/{}'.format(self.app.server.static_url_path.rstrip('/'), path)
+        # xplore's own files are served by the host of a mounted deck
+        prefix = self.url_prefix
+        if self.host is not None and path.startswith('xplore/'):
+            prefix = ''
+        return '{}{}/{}'.format(
+            prefix, self.app.server.static_url_path.rstrip('/'), path)
 
     @property
     def xplore_base_path(self):
@@ -205,11 +601,11 @@ class Xplorable:
         # this story as well as those attached to this story
         pages_css = (page.all_css_files for page in self.page_list)
 
-        return chain(
+        return _unique(chain(
             config.CSS_FILES,
             self.__class__.css_files,
             *pages_css
-        )
+        ))
 
     @property
     def all_js_files(self):
@@ -218,17 +614,47 @@ class Xplorable:
         # files come last!
         pages_js = (page.all_js_files for page in self.page_list)
 
-        return chain(
+        return _unique(chain(
             config.JS_FILES,
             self.__class__.js_files,
             *pages_js
-        )
+        ))
+
+    @property
+    def all_routes(self):
+        # the registered routes followed by those of every member of every
+        # family of pages
+        return list(chain(self.routes, *(family.routes for family in self.families)))
+
+    @property
+    def index_page_layout(self):
+        # the layout of the index page, which this attribute held before
+        # pages were built on demand
+        self.index_page.materialise()
+        return self.index_page.layout
 
     @property
     def nav_items(self):
-        return [(page.url, page.name) for page in self.page_list]
+        return [(page.href, page.name) for page in self.page_list]
 
     def __call__(self, *args):
         # This makes it so that this object can be a WSGI app target
         return self.app.server(*args)
-        
+
+
+def _normalise_prefix(url_prefix):
+    # prefixes are stored without a trailing slash, with '' for none
+    if not url_prefix or url_prefix == '/':
+        return ''
+    if not url_prefix.startswith('/'):
+        raise ValidationException("'url_prefix' param must start with '/'")
+    return url_prefix.rstrip('/')
+
+
+def _unique(paths):
+    # yields each path the first time it appears
+    seen = set()
+    for path in paths:
+        if path not in seen:
+            seen.add(path)
+            yield path